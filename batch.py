@@ -0,0 +1,152 @@
+import argparse
+import json
+import re
+import sys
+import time
+from glob import glob
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+from os.path import basename, dirname, exists, isdir, join
+from nurikabe import *
+from saveAndLoad import *
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+PUZZLE_FILE = re.compile(r"nurikabe(\d+)\.txt$")
+
+
+def puzzle_files(patterns):
+    """
+    Finds the nurikabes in the given directories or glob patterns.
+    :param patterns: list of directories or glob patterns of the files 'nurikabe<ind>.txt'
+    :return: Sorted list of pairs (directory, ind).
+    """
+    puzzles = set()
+    for pattern in patterns:
+        paths = glob(join(pattern, "nurikabe*.txt")) if isdir(pattern) else glob(pattern)
+        for path in paths:
+            match = PUZZLE_FILE.match(basename(path))
+            if match is not None:
+                puzzles.add((dirname(path), int(match.group(1))))
+    return sorted(puzzles)
+
+
+def sizes_grid(nurikabe, grid):
+    """
+    Translates a solution (see Board.grid) to the format of the pencil and paper solution.
+    :param nurikabe: A Nurikabe object.
+    :param grid: solution
+    :return: A list of lists, where an element is SEA or the final size of the island.
+    """
+    return [[SEA if component == SEA else nurikabe.board.final_sizes[component] for component in line]
+            for line in grid]
+
+
+def matches_pencil_paper(nurikabe, grid, pencil_paper_solution):
+    """
+    Checks whether the solution agrees with the (partial) pencil and paper solution.
+    :return: True or False
+    """
+    return all(expected == "" or expected == found
+               for (expected_line, found_line) in zip(pencil_paper_solution, sizes_grid(nurikabe, grid))
+               for (expected, found) in zip(expected_line, found_line))
+
+
+def solve_puzzle(directory, ind):
+    """
+    Counts the solutions of the nurikabe 'nurikabe<ind>.txt' and compares them to 'nurikabe<ind>solution.txt',
+    if it exists.
+    :param directory: the directory of the files
+    :param ind: index of the nurikabe
+    :return: A dictionary that describes the result.
+    """
+    result = {"puzzle": join(directory, "nurikabe{}.txt".format(ind))}
+    start = time.perf_counter()
+    try:
+        width, height, stems = load_nurikabe(ind, directory)
+        nurikabe = Nurikabe(width, height, stems, None, verbose=False, collect_solutions=True)
+        number = nurikabe.get_number_of_solutions()
+        result["status"] = "unique" if number == 1 else "solved" if number > 1 else "no solution"
+        result["solutions"] = number
+        result["nodes"] = nurikabe.number_of_steps
+        result["stats"] = nurikabe.stats.as_dict()
+        if exists(join(directory, "nurikabe{}solution.txt".format(ind))):
+            pencil_paper_solution = load_solution(ind, directory)
+            if isinstance(pencil_paper_solution, list):
+                result["matches_solution"] = any(matches_pencil_paper(nurikabe, grid, pencil_paper_solution)
+                                                 for grid in nurikabe.solutions)
+    except Exception as error:
+        result["status"] = "error"
+        result["error"] = repr(error)
+    result["wall_time"] = time.perf_counter() - start
+    if resource is not None:
+        result["peak_memory_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+def _run(directory, ind, connection):
+    connection.send(solve_puzzle(directory, ind))
+    connection.close()
+
+
+def solve_all(puzzles, processes=4, timeout=None, output=sys.stdout):
+    """
+    Solves the nurikabes, each in its own process, at most processes at the same time. The results are written to
+    output as JSON lines, as soon as they are known. Every process sends its result through its own pipe, so a
+    process that is terminated (because of the timeout) cannot affect the others.
+    :param puzzles: list of pairs (directory, ind), see puzzle_files
+    :param processes: the maximal number of simultaneous processes
+    :param timeout: the maximal wall time for one nurikabe (in seconds) or None
+    :param output: file-like object
+    :return: The list of the results.
+    """
+    to_do = list(reversed(puzzles))
+    running = {}  # {puzzle path: (process, receiving end of its pipe, start time)}
+    all_results = []
+
+    def report(result):
+        all_results.append(result)
+        print(json.dumps(result), file=output, flush=True)
+
+    while to_do or running:
+        while to_do and len(running) < processes:
+            directory, ind = to_do.pop()
+            receiver, sender = Pipe(duplex=False)
+            process = Process(target=_run, args=(directory, ind, sender), daemon=True)
+            process.start()
+            sender.close()
+            running[join(directory, "nurikabe{}.txt".format(ind))] = (process, receiver, time.perf_counter())
+        ready = wait([receiver for (_, receiver, _) in running.values()], timeout=0.05)
+        now = time.perf_counter()
+        for path, (process, receiver, start) in list(running.items()):
+            if receiver in ready:
+                try:
+                    result = receiver.recv()
+                except EOFError:  # the process ended without a result
+                    result = None
+                process.join()
+                if result is None:
+                    result = {"puzzle": path, "status": "error", "error": "exit code {}".format(process.exitcode),
+                              "wall_time": now - start}
+            elif timeout is not None and now - start > timeout:
+                process.terminate()
+                process.join()
+                result = {"puzzle": path, "status": "timeout", "wall_time": now - start}
+            else:
+                continue
+            receiver.close()
+            del running[path]
+            report(result)
+    return all_results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solves many nurikabes and prints one JSON line per nurikabe.")
+    parser.add_argument("puzzles", nargs="+", help="directories or glob patterns of the files nurikabe<ind>.txt")
+    parser.add_argument("-p", "--processes", type=int, default=4, help="the number of simultaneous processes")
+    parser.add_argument("-t", "--timeout", type=float, default=None, help="time limit per nurikabe (in seconds)")
+    arguments = parser.parse_args()
+    solve_all(puzzle_files(arguments.puzzles), arguments.processes, arguments.timeout)
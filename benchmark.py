@@ -0,0 +1,228 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from random import Random
+from batch import puzzle_files
+from generator import place_stems, random_solution
+from nurikabe import *
+from saveAndLoad import *
+
+PROFILED_METHODS = ("feasible_components", "nearby_islands", "is_feasible", "propagate")
+SYNTHETIC_SIZES = ((12, 16), (16, 16), (20, 20))
+
+
+def synthetic_puzzle(width, height, seed, merge_rate=0.03, carve_rate=0.4):
+    """
+    Creates a random nurikabe from a random solution (see generator.random_solution, with a single round), with
+    a random stem on every island. The solution is not necessarily unique.
+    :param width: The width of the nurikabe.
+    :param height: The height of the nurikabe.
+    :param seed: the seed of the random generator
+    :param merge_rate: the probability that a sea field is turned into an island field
+    :param carve_rate: the probability that an island field is turned into a sea field
+    :return: List of triples (x, y, size), i.e., the island stems of the nurikabe.
+    """
+    random = Random(seed)
+    board = Board(width, height, [])  # used for its geometry only
+    sea = random_solution(board, random, moves=1, merge_rate=merge_rate, carve_rate=carve_rate)
+    return place_stems(board, sea, [], random)
+
+
+def benchmark_puzzles(directory, synthetic_sizes=SYNTHETIC_SIZES):
+    """
+    :param directory: the directory of the nurikabes 'nurikabe<ind>.txt'
+    :param synthetic_sizes: list of pairs (width, height) of the synthetic nurikabes
+    :return: List of triples (name, (width, height, stems), only until first solution).
+    """
+    puzzles = []
+    for (directory, ind) in puzzle_files([directory]):
+        puzzles.append(("nurikabe{}".format(ind), load_nurikabe(ind, directory), False))
+    for (width, height) in synthetic_sizes:
+        puzzles.append(("synthetic{}x{}".format(width, height), (width, height, synthetic_puzzle(width, height, 0)),
+                        True))
+    return puzzles
+
+
+def profile_methods(nurikabe):
+    """
+    Replaces the methods PROFILED_METHODS of the Nurikabe object with wrappers that count the calls and measure the
+    (inclusive) time spent in them.
+    :param nurikabe: A Nurikabe object.
+    :return: A dictionary {method name: [calls, time]} that the wrappers update.
+    """
+    stats = {}
+    for name in PROFILED_METHODS:
+        method = getattr(nurikabe, name)
+        stats[name] = [0, 0.0]
+
+        def wrapper(*args, __method=method, __stats=stats[name], **kwargs):
+            start = time.perf_counter()
+            try:
+                return __method(*args, **kwargs)
+            finally:
+                __stats[0] += 1
+                __stats[1] += time.perf_counter() - start
+
+        setattr(nurikabe, name, wrapper)
+    return stats
+
+
+def run(width, height, stems, only_untill_first_solution, profile=False, heuristic=None):
+    """
+    Solves the nurikabe once.
+    :return: (Nurikabe object, wall time, method statistics or None)
+    """
+    start = time.perf_counter()
+    nurikabe = Nurikabe(width, height, stems, None, verbose=False)
+    if heuristic is not None:
+        nurikabe.heuristic = heuristic
+    stats = profile_methods(nurikabe) if profile else None
+    nurikabe.solve_iterative(only_untill_first_solution)
+    return nurikabe, time.perf_counter() - start, stats
+
+
+def benchmark(puzzles, repeat=5, warm_up=1):
+    """
+    Measures the solver on the puzzles. The wall time is the median of repeat runs without profiling (after warm_up
+    runs that are not timed), the method statistics come from a profiled run, and the peak memory from a run under
+    tracemalloc.
+    :param puzzles: see benchmark_puzzles
+    :param repeat: the number of timed runs per puzzle
+    :param warm_up: the number of runs per puzzle before the timed ones
+    :return: A dictionary {name: results}.
+    """
+    results = {}
+    for (name, (width, height, stems), only_untill_first_solution) in puzzles:
+        for _ in range(warm_up):
+            run(width, height, stems, only_untill_first_solution)
+        times = []
+        for _ in range(repeat):
+            nurikabe, wall_time, _ = run(width, height, stems, only_untill_first_solution)
+            times.append(wall_time)
+        _, _, stats = run(width, height, stems, only_untill_first_solution, profile=True)
+        tracemalloc.start()
+        run(width, height, stems, only_untill_first_solution)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        wall_time = sorted(times)[len(times) // 2]
+        results[name] = {"size": "{}x{}".format(width, height),
+                         "solutions": nurikabe.number_feasible_solutions,
+                         "nodes": nurikabe.number_of_steps,
+                         "wall_time": wall_time,
+                         "nodes_per_second": nurikabe.number_of_steps / wall_time if wall_time > 0 else None,
+                         "peak_memory_kb": peak_memory / 1024,
+                         "methods": {m: {"calls": calls, "time": t} for (m, (calls, t)) in stats.items()}}
+    return results
+
+
+def compare_heuristics(puzzles, heuristics=HEURISTICS, repeat=1):
+    """
+    Solves the puzzles with every heuristic.
+    :param puzzles: see benchmark_puzzles
+    :param heuristics: A dictionary {name: Heuristic object}.
+    :param repeat: the number of timed runs per puzzle and heuristic
+    :return: A dictionary {puzzle name: {heuristic name: results}}.
+    """
+    results = {}
+    for (name, (width, height, stems), only_untill_first_solution) in puzzles:
+        results[name] = {}
+        for heuristic_name, heuristic in heuristics.items():
+            times = []
+            for _ in range(repeat):
+                nurikabe, wall_time, _ = run(width, height, stems, only_untill_first_solution, heuristic=heuristic)
+                times.append(wall_time)
+            results[name][heuristic_name] = {"solutions": nurikabe.number_feasible_solutions,
+                                             "nodes": nurikabe.number_of_steps,
+                                             "guesses": nurikabe.stats.guesses,
+                                             "wall_time": min(times)}
+    return results
+
+
+def print_comparison(results, output=sys.stdout):
+    print("{:<24}{:<24}{:>10}{:>8}{:>9}{:>11}".format("puzzle", "heuristic", "solutions", "nodes", "guesses",
+                                                      "time [s]"), file=output)
+    totals = {}
+    for name, by_heuristic in results.items():
+        for heuristic_name, r in by_heuristic.items():
+            print("{:<24}{:<24}{:>10}{:>8}{:>9}{:>11.4f}".format(name, heuristic_name, r["solutions"], r["nodes"],
+                                                               r["guesses"], r["wall_time"]), file=output)
+            total = totals.setdefault(heuristic_name, [0, 0.0])
+            total[0] += r["nodes"]
+            total[1] += r["wall_time"]
+    for heuristic_name, (nodes, wall_time) in totals.items():
+        print("{:<24}{:<24}{:>10}{:>8}{:>9}{:>11.4f}".format("total", heuristic_name, "", nodes, "", wall_time),
+              file=output)
+
+
+def regressions(results, baseline, threshold=0.5, min_slowdown=0.05):
+    """
+    Compares the results to the baseline. The numbers of solutions and nodes do not depend on the machine, so they
+    are compared exactly (a different number of solutions, or more nodes, is a regression). The wall time is noisy,
+    so it is a regression only if it increases by more than the threshold and by more than min_slowdown.
+    :param results: see benchmark
+    :param baseline: results of an earlier run
+    :param threshold: the allowed relative increase of the wall time, e.g., 0.5 for 50 %
+    :param min_slowdown: the allowed absolute increase of the wall time (in seconds)
+    :return: List of strings that describe the regressions.
+    """
+    found = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if result["solutions"] != old["solutions"]:
+            found.append("{}: {} solutions instead of {}".format(name, result["solutions"], old["solutions"]))
+        if result["wall_time"] > max(old["wall_time"] * (1 + threshold), old["wall_time"] + min_slowdown):
+            found.append("{}: wall time {:.4f} s instead of {:.4f} s".format(name, result["wall_time"],
+                                                                           old["wall_time"]))
+        if result["nodes"] > old["nodes"]:
+            found.append("{}: {} nodes instead of {}".format(name, result["nodes"], old["nodes"]))
+    return found
+
+
+def print_results(results, output=sys.stdout):
+    print("{:<24}{:>8}{:>10}{:>8}{:>11}{:>12}{:>12}".format("puzzle", "size", "solutions", "nodes", "time [s]",
+                                                          "nodes/s", "memory [kB]"), file=output)
+    for name, r in results.items():
+        print("{:<24}{:>8}{:>10}{:>8}{:>11.4f}{:>12.0f}{:>12.0f}".format(name, r["size"], r["solutions"], r["nodes"],
+                                                                      r["wall_time"], r["nodes_per_second"] or 0,
+                                                                      r["peak_memory_kb"]), file=output)
+        print("    " + ", ".join("{}: {} calls, {:.4f} s".format(m, s["calls"], s["time"])
+                                 for (m, s) in r["methods"].items()), file=output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the solver and compares the results to a baseline.")
+    parser.add_argument("--puzzles", default="exampleNurikabes", help="the directory of the nurikabes")
+    parser.add_argument("--repeat", type=int, default=5, help="the number of timed runs per puzzle")
+    parser.add_argument("--warm-up", type=int, default=1, help="the number of untimed runs per puzzle before them")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="the file with the baseline results")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="the allowed relative slowdown (the numbers of nodes and solutions must not change)")
+    parser.add_argument("--heuristics", action="store_true",
+                        help="compare the branching heuristics on the nurikabes of the directory instead "
+                             "(the synthetic nurikabes and the baseline are not used)")
+    arguments = parser.parse_args()
+    if arguments.heuristics:
+        puzzles = benchmark_puzzles(arguments.puzzles, synthetic_sizes=())
+        print_comparison(compare_heuristics(puzzles, repeat=arguments.repeat))
+        sys.exit(0)
+    results = benchmark(benchmark_puzzles(arguments.puzzles), arguments.repeat, arguments.warm_up)
+    print_results(results)
+    if arguments.save:
+        with open(arguments.baseline, "w") as f:
+            json.dump(results, f, indent=1)
+    else:
+        try:
+            with open(arguments.baseline) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            baseline = None
+        if baseline is not None:
+            found = regressions(results, baseline, arguments.threshold)
+            for regression in found:
+                print("REGRESSION", regression)
+            sys.exit(1 if found else 0)
@@ -0,0 +1,515 @@
+from array import array
+from constants import *
+
+
+def iterate_bits(mask):
+    """
+    Iterates over the indices of the set bits of the given mask, in increasing order.
+    :param mask: non-negative integer
+    :return: A generator of integers.
+    """
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def check_stems(width, height, islands_stems):
+    """
+    Checks that every stem lies on the board, has a size of at least 1, and has its own field.
+    :param width: The width of the Nurikabe.
+    :param height: The height of the Nurikabe.
+    :param islands_stems: List of triples (x, y, size).
+    :return: None
+    :raises ValueError: if a stem is invalid
+    """
+    positions = set()
+    for (x, y, size) in islands_stems:
+        if not (0 <= x < width and 0 <= y < height) or size < 1 or (x, y) in positions:
+            raise ValueError("Invalid stem {} on a {} x {} board (outside the board, size smaller than 1 or "
+                             "repeated position).".format((x, y, size), width, height))
+        positions.add((x, y))
+
+
+class Board:
+    SEA_CUT_FLOODS = 8  # see separates_sea
+
+    def __init__(self, width, height, islands_stems):
+        """
+        Constructor for this class. The board stores the state of the Nurikabe in flat arrays, indexed by
+        y * width + x, and in integer bitmasks (bit y * width + x corresponds to the field (x, y)).
+        :param width: The width of the Nurikabe.
+        :param height: The height of the Nurikabe.
+        :param islands_stems: List of triples (x, y, size), as in the constructor of the class Nurikabe.
+        The island that grows from the i-th stem has component i + 1.
+        :return: A Board object.
+        :raises ValueError: if a stem is invalid, see check_stems
+        """
+        check_stems(width, height, islands_stems)
+        self.width = width
+        self.height = height
+        self.number_of_fields = width * height
+        self.full_mask = (1 << self.number_of_fields) - 1
+        # masks that prevent the wrap-around of the rows when shifting by one column
+        left_column = sum(1 << (y * width) for y in range(height))
+        self.not_left_column = self.full_mask ^ left_column
+        self.not_right_column = self.full_mask ^ (left_column << (width - 1))
+        # the top-left corners of the 2 x 2 squares
+        self.square_corners = self.not_right_column & ((1 << (width * (height - 1))) - 1)
+        # neighbour index tables
+        neighbours = []
+        for y in range(height):
+            for x in range(width):
+                index = y * width + x
+                neighbours.append(tuple(i for (i, ok) in [(index - 1, x > 0), (index + 1, x < width - 1),
+                                                          (index - width, y > 0), (index + width, y < height - 1)]
+                                        if ok))
+        self.neighbours = tuple(neighbours)
+        self.neighbour_masks = [sum(1 << i for i in ns) for ns in self.neighbours]
+        # for every field, the masks of the other three fields of each 2 x 2 square that contains it
+        squares = [[] for _ in range(self.number_of_fields)]
+        for y in range(height - 1):
+            for x in range(width - 1):
+                corners = [y * width + x, y * width + x + 1, (y + 1) * width + x, (y + 1) * width + x + 1]
+                for corner in corners:
+                    squares[corner].append(sum(1 << c for c in corners if c != corner))
+        self.square_masks = tuple(tuple(s) for s in squares)
+        # for every field, the pairs of orthogonal neighbours that are connected through a common diagonal neighbour:
+        # [(mask of the pair, index of the diagonal neighbour), ...]
+        links = [[] for _ in range(self.number_of_fields)]
+        for y in range(height - 1):
+            for x in range(width - 1):
+                corners = [y * width + x, y * width + x + 1, (y + 1) * width + x + 1, (y + 1) * width + x]
+                for i, corner in enumerate(corners):
+                    pair = (1 << corners[(i + 1) % 4]) | (1 << corners[(i + 3) % 4])
+                    links[corner].append((pair, corners[(i + 2) % 4]))
+        self.diagonal_links = tuple(tuple(link) for link in links)
+        # for every field, the fields that are at most two steps away
+        self.vicinity_masks = tuple(self.expand(self.expand(1 << i)) for i in range(self.number_of_fields))
+        # state
+        self.component = array("h", [UNKNOWN] * self.number_of_fields)
+        self.final_sizes = array("h", [SEA] + [size for (_, _, size) in islands_stems])
+        self.number_of_islands = len(islands_stems)
+        self.island_masks = [0] * (self.number_of_islands + 1)  # index 0 is not used
+        self.island_sizes = array("h", [0] * (self.number_of_islands + 1))
+        self.sea_mask = 0
+        self.unknown_mask = self.full_mask
+        self.trail = array("i")  # indices of the assigned fields, in the order of assignment
+        self.reach_cache = {}  # {component: (mask of the fields that the reach depends on, reach, mask of reach)}
+        self.reach_log = []  # [(length of the trail, component, previous entry or None), ...], see island_reach
+        self.reach_changes = 0  # the union of the masks of the forgotten reaches, see _invalidate_reach
+        self.sea_cut_cache = []  # [[length of the trail, is sea connected, ...], ...], see _sea_state
+        for component, (x, y, _) in enumerate(islands_stems, 1):
+            self.assign(self.index(x, y), component)
+        self.root = len(self.trail)
+
+    def index(self, x, y):
+        return y * self.width + x
+
+    def coordinates(self, index):
+        return index % self.width, index // self.width
+
+    def is_sea(self, index):
+        return self.component[index] == SEA
+
+    def is_unknown(self, index):
+        return self.component[index] == UNKNOWN
+
+    def is_proper_island(self, index):
+        return self.component[index] > 0
+
+    def island_mask(self):
+        """
+        :return: The mask of all the fields that belong to proper islands.
+        """
+        return self.full_mask ^ self.sea_mask ^ self.unknown_mask
+
+    def possible_expansion(self, component):
+        """
+        Computes the number of missing fields of the island.
+        :param component: component of a proper island
+        :return: The number of missing fields in the island.
+        """
+        return self.final_sizes[component] - self.island_sizes[component]
+
+    def assign(self, index, component):
+        """
+        Assigns the unknown field to the given component (a proper island or SEA) and records this on the trail.
+        :param index: index of the field
+        :param component: component of the field
+        :return: None
+        """
+        bit = 1 << index
+        self.component[index] = component
+        self.unknown_mask ^= bit
+        if component == SEA:
+            self.sea_mask |= bit
+        else:
+            self.island_masks[component] |= bit
+            self.island_sizes[component] += 1
+        self.trail.append(index)
+        if self.reach_cache:
+            self._invalidate_reach(index, component)
+
+    def unassign(self):
+        """
+        Reverts the last assignment on the trail.
+        :return: The index of the field that is unknown again.
+        """
+        index = self.trail.pop()
+        bit = 1 << index
+        component = self.component[index]
+        self.component[index] = UNKNOWN
+        self.unknown_mask |= bit
+        if component == SEA:
+            self.sea_mask ^= bit
+        else:
+            self.island_masks[component] ^= bit
+            self.island_sizes[component] -= 1
+        position = len(self.trail)
+        while self.sea_cut_cache and self.sea_cut_cache[-1][0] > position:
+            self.sea_cut_cache.pop()
+        while self.reach_log and self.reach_log[-1][0] > position:
+            _, component, previous = self.reach_log.pop()
+            if previous is None:
+                del self.reach_cache[component]
+            else:
+                self.reach_cache[component] = previous
+        return index
+
+    def _invalidate_reach(self, index, component):
+        """
+        Forgets the reaches of the islands that depend on the newly assigned field, and the reach of the island that
+        the field was assigned to. The reaches can only shrink because of the assignment, so the fields whose
+        distances from some island might have changed are collected in reach_changes.
+        :param index: index of the assigned field
+        :param component: the component of the field
+        :return: None
+        """
+        position = len(self.trail)
+        for c in [c for (c, (depends_on, _, _)) in self.reach_cache.items() if c == component or depends_on >> index & 1]:
+            entry = self.reach_cache.pop(c)
+            self.reach_log.append((position, c, entry))
+            self.reach_changes |= entry[2]
+
+    def undo(self, mark):
+        """
+        Reverts all the assignments that were made after the trail had length mark.
+        :param mark: the length of the trail that we return to
+        :return: None
+        """
+        while len(self.trail) > mark:
+            self.unassign()
+
+    def expand(self, mask):
+        """
+        Computes the mask of the fields that are in mask or are neighbours of a field in mask.
+        :param mask: mask of fields
+        :return: mask of fields
+        """
+        return (mask | ((mask << 1) & self.not_left_column) | ((mask >> 1) & self.not_right_column) |
+                ((mask << self.width) & self.full_mask) | (mask >> self.width))
+
+    def flood(self, seed, region):
+        """
+        Computes the fields of region that are connected to seed within region.
+        :param seed: mask of the starting fields (should be a subset of region)
+        :param region: mask of the allowed fields
+        :return: mask of the reached fields
+        """
+        reached = seed & region
+        while True:
+            grown = self.expand(reached) & region
+            if grown == reached:
+                return reached
+            reached = grown
+
+    def is_connected(self, mask, region=None):
+        """
+        Checks whether the fields in mask are connected through the fields of region (by default, mask itself).
+        :param mask: mask of fields
+        :param region: mask of fields that the connecting paths may use (should contain mask)
+        :return: True if mask is empty or connected, False otherwise.
+        """
+        if not mask:
+            return True
+        seed = mask & -mask
+        return self.flood(seed, mask if region is None else region) & mask == mask
+
+    def parts(self, mask):
+        """
+        Iterates over the connected parts of the fields in mask.
+        :param mask: mask of fields
+        :return: A generator of masks.
+        """
+        while mask:
+            part = self.flood(mask & -mask, mask)
+            mask ^= part
+            yield part
+
+    def pool_completions(self):
+        """
+        Finds the unknown fields that would complete a 2 x 2 sea area, if they were coloured as sea.
+        :return: mask of such fields
+        """
+        sea, unknown, width, corners = self.sea_mask, self.unknown_mask, self.width, self.square_corners
+        top_left, top_right = sea & corners, (sea >> 1) & corners
+        bottom_left, bottom_right = (sea >> width) & corners, (sea >> (width + 1)) & corners
+        return ((unknown & corners & top_right & bottom_left & bottom_right) |
+                ((top_left & (unknown >> 1) & bottom_left & bottom_right) << 1) |
+                ((top_left & top_right & (unknown >> width) & bottom_right) << width) |
+                ((top_left & top_right & bottom_left & (unknown >> (width + 1))) << (width + 1)))
+
+    def closing_exits(self):
+        """
+        Finds the unknown fields that are the only neighbour, which is not sea, of a field of an island that has more
+        than one field. Colouring such a field as sea would isolate the island field.
+        :return: mask of such fields
+        """
+        growing = 0
+        for component in range(1, self.number_of_islands + 1):
+            if self.final_sizes[component] > 1:
+                growing |= self.island_masks[component]
+        open_fields = self.full_mask ^ self.sea_mask
+        once = twice = 0
+        for direction in ((open_fields << 1) & self.not_left_column, (open_fields >> 1) & self.not_right_column,
+                          (open_fields << self.width) & self.full_mask, open_fields >> self.width):
+            twice |= once & direction
+            once |= direction
+        return self.expand(growing & once & ~twice) & self.unknown_mask
+
+    def sea_bans(self):
+        """
+        Finds the unknown fields that cannot be sea: they would complete a 2 x 2 sea area (see pool_completions),
+        or isolate an island field (see closing_exits). The result is computed for the whole board at once and kept
+        until the assignments that it depends on are reverted.
+        :return: mask of such fields
+        """
+        state = self._sea_state()
+        if state[4] is None:
+            state[4] = self.pool_completions() | self.closing_exits()
+        return state[4]
+
+    def would_create_pool(self, index):
+        """
+        Checks whether colouring the field as sea would create a 2 x 2 sea area.
+        :param index: index of the field
+        :return: True or False
+        """
+        sea = self.sea_mask
+        return any(sea & square == square for square in self.square_masks[index])
+
+    def _sea_state(self):
+        """
+        The state of the sea is computed once per position on the trail and kept until the assignments that it depends
+        on are reverted.
+        :return: [length of the trail, is the sea connected through the sea and unknown fields, sea cuts or None,
+        the number of the questions that separates_sea has answered with a flood fill, sea bans or None]
+        """
+        position = len(self.trail)
+        if not self.sea_cut_cache or self.sea_cut_cache[-1][0] != position:
+            self.sea_cut_cache.append([position, self.is_connected(self.sea_mask, self.sea_mask | self.unknown_mask),
+                                       None, 0, None])
+        return self.sea_cut_cache[-1]
+
+    def sea_cuts(self):
+        """
+        Finds the unknown fields that must not become parts of proper islands, because the sea would not be connected
+        (through the sea and unknown fields) anymore.
+        :return: The mask of such fields. If the sea is already disconnected, these are all the unknown fields.
+        """
+        state = self._sea_state()
+        if state[2] is None:
+            state[2] = self._find_sea_cuts() if state[1] else self.unknown_mask
+        return state[2]
+
+    def is_local_cut(self, index, region):
+        """
+        Checks whether the orthogonal neighbours of the field that are in region are connected through the diagonal
+        neighbours of the field that are in region. If they are, removing the field from region cannot disconnect it.
+        :param index: index of the field
+        :param region: mask of fields
+        :return: True if the neighbours are not connected in this way, False otherwise.
+        """
+        neighbours = region & self.neighbour_masks[index]
+        count = neighbours.bit_count()
+        if count <= 1:
+            return False
+        for pair, diagonal in self.diagonal_links[index]:
+            if neighbours & pair == pair and region >> diagonal & 1:
+                count -= 1
+        return count > 1
+
+    def separates_sea(self, index):
+        """
+        Checks whether the sea would not be connected (through the sea and unknown fields) anymore,
+        if the unknown field became a part of a proper island.
+        :param index: index of the field
+        :return: True or False
+        """
+        if not self.sea_mask:
+            return False
+        state = self._sea_state()
+        if not state[1]:
+            return True
+        region = self.sea_mask | self.unknown_mask
+        if not self.is_local_cut(index, region):
+            return False
+        if state[2] is None and state[3] < self.SEA_CUT_FLOODS:
+            # a few flood fills are cheaper than the search for all the articulation points
+            state[3] += 1
+            return not self.is_connected(self.sea_mask, region ^ (1 << index))
+        return self.sea_cuts() >> index & 1 == 1
+
+    def _find_sea_cuts(self):
+        """
+        Computes sea_cuts for a connected sea with a single (iterative) depth first search over the sea and unknown fields, which finds the
+        articulation points of this region, together with the number of sea fields that each of them separates.
+        :return: The mask of the unknown fields that separate the sea.
+        """
+        sea = self.sea_mask
+        if not sea:
+            return 0
+        open_mask = sea | self.unknown_mask
+        neighbours = self.neighbours
+        discovery = [0] * self.number_of_fields  # 0 means not visited
+        low = [0] * self.number_of_fields
+        sea_below = [0] * self.number_of_fields  # the number of sea fields in the subtree
+        separated = [0] * self.number_of_fields  # the number of sea fields in the subtrees that the field separates
+        parts = [0] * self.number_of_fields  # the number of such subtrees that contain a sea field
+        root = (sea & -sea).bit_length() - 1
+        discovery[root] = low[root] = counter = 1
+        sea_below[root] = 1
+        stack = [(root, iter(neighbours[root]))]
+        while stack:
+            field, to_visit = stack[-1]
+            for neighbour in to_visit:
+                if open_mask >> neighbour & 1:
+                    if not discovery[neighbour]:
+                        counter += 1
+                        discovery[neighbour] = low[neighbour] = counter
+                        sea_below[neighbour] = sea >> neighbour & 1
+                        stack.append((neighbour, iter(neighbours[neighbour])))
+                        break
+                    elif discovery[neighbour] < low[field]:
+                        low[field] = discovery[neighbour]
+            else:
+                stack.pop()
+                if stack:
+                    parent = stack[-1][0]
+                    sea_below[parent] += sea_below[field]
+                    if low[field] < low[parent]:
+                        low[parent] = low[field]
+                    if low[field] >= discovery[parent] and sea_below[field]:
+                        separated[parent] += sea_below[field]
+                        parts[parent] += 1
+        total = sea.bit_count()
+        cuts = 0
+        for field in iterate_bits(self.unknown_mask):
+            if parts[field] > 1 or (parts[field] == 1 and separated[field] < total):
+                cuts |= 1 << field
+        return cuts
+
+    def island_reach(self, component):
+        """
+        Finds the unknown fields that the island could be expanded to, together with the distances from the island.
+        The distance between a field and (a connected part of) the island is the minimal number of unknown fields
+        (including the field itself) on a path that connects them through the island and unknown fields. It must not
+        exceed the possible expansion of the island. If the island consists of several parts, the field must be
+        within reach of each of them, and the distance is the minimal one.
+        The result is kept until one of the fields in the neighbourhood of the explored area changes, and restored when
+        this change is reverted.
+        :param component: component of a proper island
+        :return: A dictionary {index of the field: distance}.
+        """
+        entry = self.reach_cache.get(component)
+        if entry is None:
+            depends_on, reach = self._find_island_reach(component)
+            entry = (depends_on, reach, sum(1 << field for field in reach))
+            self.reach_cache[component] = entry
+            self.reach_log.append((len(self.trail), component, None))
+        return entry[1]
+
+    def island_contacts(self, mask):
+        """
+        Finds the fields in mask that touch the islands.
+        :param mask: mask of fields (e.g., of the unknown fields)
+        :return: (touching, touched_once, touched_twice): touching[component] is the mask of the fields that touch
+         the island (index 0 is not used), touched_once and touched_twice the masks of the fields that touch at
+         least one and at least two different islands.
+        """
+        touched_once = touched_twice = 0
+        touching = [0] * (self.number_of_islands + 1)
+        for component in range(1, self.number_of_islands + 1):
+            touching[component] = self.expand(self.island_masks[component]) & mask
+            touched_twice |= touched_once & touching[component]
+            touched_once |= touching[component]
+        return touching, touched_once, touched_twice
+
+    @staticmethod
+    def touching_others(contacts, component):
+        """
+        :param contacts: the result of island_contacts
+        :param component: component of a proper island
+        :return: The mask of the fields that touch an island other than the given one (so they cannot be part of it).
+        """
+        touching, touched_once, touched_twice = contacts
+        return touched_twice | (touched_once & ~touching[component])
+
+    def reach_mask(self, component):
+        """
+        :param component: component of a proper island
+        :return: The mask of the fields in island_reach(component).
+        """
+        self.island_reach(component)
+        return self.reach_cache[component][2]
+
+    def _find_island_reach(self, component):
+        """
+        Computes island_reach with a breadth first search (with the weights 0 and 1) from every part of the island.
+        The search proceeds a whole layer of fields at once: the unknown fields at distance d are the unknown
+        neighbours of the layer d - 1, and the layer d also contains the island fields that are connected to them
+        through the island.
+        :param component: component of a proper island
+        :return: (mask of the fields that the reach depends on, reach)
+        """
+        expansion = self.possible_expansion(component)
+        island_mask = self.island_masks[component]
+        unknown_mask = self.unknown_mask
+        depends_on = island_mask
+        reach = None
+        to_start = island_mask
+        while to_start and reach != {}:
+            part = self.flood(to_start & -to_start, island_mask)
+            to_start &= ~part
+            part_reach = {}
+            layer = reached = part
+            for dist in range(1, expansion + 1):
+                grown = self.expand(layer)
+                depends_on |= grown
+                layer = grown & unknown_mask & ~reached
+                if not layer:
+                    break
+                for field in iterate_bits(layer):
+                    part_reach[field] = dist
+                layer |= self.flood(layer, layer | (island_mask & ~reached)) & island_mask
+                reached |= layer
+            if reach is None:
+                reach = part_reach
+            else:
+                reach = {field: min(dist, reach[field]) for (field, dist) in part_reach.items() if field in reach}
+        return depends_on, reach
+
+    def assignments(self, start=None):
+        """
+        :param start: the position on the trail (by default, the stems are omitted)
+        :return: List of pairs (index, component) of the assignments after the given position on the trail.
+        """
+        start = self.root if start is None else start
+        return [(index, self.component[index]) for index in self.trail[start:]]
+
+    def grid(self):
+        """
+        :return: A list of height lists of length width, where the element [y][x] is the component of (x, y).
+        """
+        return [list(self.component[y * self.width:(y + 1) * self.width]) for y in range(self.height)]
@@ -0,0 +1,57 @@
+import time
+
+# the reasons for stopping a search early, see Budget
+NODE_BUDGET = "node budget"
+DEADLINE = "deadline"
+CANCELLED = "cancelled"
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Budget:
+    def __init__(self, max_nodes=None, time_limit=None, cancel=None):
+        """
+        Constructor for this class. A budget limits a search: it is checked at every node (see Nurikabe.visit) and
+        raises BudgetExceeded when the search has to stop. It also remembers the most determined board (the one with
+        the fewest unknown fields) that the search has reached (see record).
+        :param max_nodes: None or the maximal number of visited nodes
+        :param time_limit: None or the maximal wall time (in seconds), counted from the creation of the budget
+        :param cancel: None or an object with the method is_set() (e.g., threading.Event), which stops the search
+         when it returns True
+        :return: A Budget object.
+        """
+        self.max_nodes = max_nodes
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.cancel = cancel
+        self.nodes = 0
+        self.best_unknown = None  # the number of the unknown fields of best_board
+        self.best_board = None  # see Board.grid
+
+    def check(self, nurikabe):
+        """
+        Counts the node, and stops the search if the budget is exceeded.
+        :param nurikabe: A Nurikabe object.
+        :return: None
+        """
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise BudgetExceeded(NODE_BUDGET)
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise BudgetExceeded(DEADLINE)
+        if self.cancel is not None and self.cancel.is_set():
+            raise BudgetExceeded(CANCELLED)
+        self.nodes += 1
+
+    def record(self, nurikabe):
+        """
+        Remembers the board, if it is the most determined one so far.
+        :param nurikabe: A Nurikabe object.
+        :return: None
+        """
+        unknown = nurikabe.board.unknown_mask.bit_count()
+        if self.best_unknown is None or unknown < self.best_unknown:
+            self.best_unknown = unknown
+            self.best_board = nurikabe.board.grid()
@@ -0,0 +1,75 @@
+import json
+import os
+from nurikabe import *
+
+
+def save_checkpoint(nurikabe, stack, only_untill_first_solution, path):
+    """
+    Saves the state of the search of Nurikabe.search: the nurikabe, the counters and, for every frame of the stack,
+    the field, its components and the number of the tried components. The file is replaced atomically, so that
+    a killed process leaves either the old or the new checkpoint.
+    :param nurikabe: A Nurikabe object.
+    :param stack: the stack of frames (see Nurikabe.solve_iterative)
+    :param only_untill_first_solution: see Nurikabe.solve
+    :param path: the path of the checkpoint
+    :return: None
+    """
+    state = {"width": nurikabe.width,
+             "height": nurikabe.height,
+             "islands_stems": nurikabe.islands_stems,
+             "only_untill_first_solution": only_untill_first_solution,
+             "heuristic": nurikabe.heuristic.name,
+             "number_feasible_solutions": nurikabe.number_feasible_solutions,
+             "number_of_steps": nurikabe.number_of_steps,
+             "stats": nurikabe.stats.as_dict(),
+             "solutions": nurikabe.solutions if nurikabe.collect_solutions else None,
+             "stack": [[field, [component for (_, component) in components], tried]
+                       for (field, components, tried, *_) in stack]}
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path, verbose=False):
+    """
+    Reconstructs the state of the search from the checkpoint. The nodes on the path to the current node are
+    entered again (see Nurikabe.branching), so that the board is exactly the same as when the checkpoint was saved.
+    :param path: the path of the checkpoint
+    :param verbose: see Nurikabe
+    :return: (Nurikabe object, stack, only_untill_first_solution)
+    """
+    with open(path) as f:
+        state = json.load(f)
+    nurikabe = Nurikabe(state["width"], state["height"], [tuple(stem) for stem in state["islands_stems"]], None,
+                        verbose=verbose, collect_solutions=state["solutions"] is not None)
+    nurikabe.heuristic = HEURISTICS[state.get("heuristic", Heuristic.name)]
+    stack = []
+    for (field, saved_components, tried) in state["stack"]:
+        mark = len(nurikabe.board.trail)
+        _, chosen_field, components = nurikabe.branching()
+        if chosen_field != field or [component for (_, component) in components] != saved_components:
+            raise ValueError("The checkpoint {} does not match the search of the nurikabe.".format(path))
+        stack.append([field, components, tried, mark])
+        if tried > 0:
+            nurikabe.assign(field, components[tried - 1][1])
+    nurikabe.depth = len(stack) - 1
+    nurikabe.number_feasible_solutions = state["number_feasible_solutions"]
+    nurikabe.number_of_steps = state["number_of_steps"]
+    nurikabe.stats.restore(state["stats"])
+    if state["solutions"] is not None:
+        nurikabe.solutions = state["solutions"]
+    return nurikabe, stack, state["only_untill_first_solution"]
+
+
+def resume(path, checkpoint_interval=5.0, verbose=False):
+    """
+    Continues the search from the checkpoint, and keeps saving checkpoints to the same file.
+    :param path: the path of the checkpoint
+    :param checkpoint_interval: see Nurikabe.solve_iterative
+    :param verbose: see Nurikabe
+    :return: The Nurikabe object after the search.
+    """
+    nurikabe, stack, only_untill_first_solution = load_checkpoint(path, verbose)
+    nurikabe.search(stack, only_untill_first_solution, path, checkpoint_interval)
+    return nurikabe
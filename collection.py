@@ -0,0 +1,161 @@
+import argparse
+import mmap
+import struct
+from os.path import exists, join
+from batch import puzzle_files
+from saveAndLoad import *
+
+# The collection file consists of
+#   header: magic, the number of puzzles, the offset of the index
+#   records: one per puzzle, see _pack
+#   index: the offsets of the records (8 bytes each)
+MAGIC = b"NURIKAB1"
+HEADER = struct.Struct("<8sQQ")
+RECORD = struct.Struct("<IHHIB")     # ind, width, height, the number of stems, the kind of the solution
+STEM_RECORD = struct.Struct("<HHI")  # x, y, size
+OFFSET = struct.Struct("<Q")
+NO_SOLUTION, GRID_SOLUTION, FALSE_SOLUTION, TRUE_SOLUTION = range(4)
+UNKNOWN_VALUE = -1                   # '' in the pencil-paper solution
+
+
+def _pack(ind, width, height, stems, solution):
+    """
+    :return: The record of the puzzle: RECORD, the stems (STEM_RECORD each) and, if the solution is a grid,
+     its values (4-byte integers, line by line).
+    """
+    if solution is None:
+        kind = NO_SOLUTION
+    elif isinstance(solution, bool):
+        kind = TRUE_SOLUTION if solution else FALSE_SOLUTION
+    else:
+        kind = GRID_SOLUTION
+    parts = [RECORD.pack(ind, width, height, len(stems), kind)]
+    parts += [STEM_RECORD.pack(x, y, size) for (x, y, size) in stems]
+    if kind == GRID_SOLUTION:
+        values = [UNKNOWN_VALUE if value == "" else value for line in solution for value in line]
+        if len(solution) != height or len(values) != width * height:
+            raise ValueError("The solution of the nurikabe {} is not of size {} x {}.".format(ind, width, height))
+        parts.append(struct.pack("<{}i".format(len(values)), *values))
+    return b"".join(parts)
+
+
+def write_collection(path, puzzles):
+    """
+    Writes the puzzles to a collection file. The puzzles are written one by one, so they need not fit in memory.
+    :param path: the path of the collection
+    :param puzzles: iterable of tuples (ind, width, height, stems, solution), where solution is None, a logic
+     value or a grid (see load_solution)
+    :return: The number of the puzzles.
+    :raises ValueError: if two puzzles have the same index (they would overwrite each other, see write_directory)
+    """
+    offsets = []
+    indices = set()
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, 0, 0))
+        for puzzle in puzzles:
+            if puzzle[0] in indices:
+                raise ValueError("There are two puzzles with the index {}.".format(puzzle[0]))
+            indices.add(puzzle[0])
+            offsets.append(f.tell())
+            f.write(_pack(*puzzle))
+        index = f.tell()
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, len(offsets), index))
+    return len(offsets)
+
+
+class Collection:
+    def __init__(self, path):
+        """
+        Constructor for this class. A collection of puzzles, memory mapped, so that a puzzle can be read without
+        reading the whole file.
+        :param path: the path of the collection
+        :return: A Collection object.
+        """
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.number_of_puzzles, self.index = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("{} is not a collection of nurikabes.".format(path))
+
+    def __len__(self):
+        return self.number_of_puzzles
+
+    def __getitem__(self, i):
+        """
+        :param i: the position of the puzzle in the collection
+        :return: (ind, width, height, stems, solution), see write_collection
+        """
+        if not 0 <= i < self.number_of_puzzles:
+            raise IndexError("There is no puzzle {} in the collection.".format(i))
+        offset = OFFSET.unpack_from(self.data, self.index + i * OFFSET.size)[0]
+        ind, width, height, number_of_stems, kind = RECORD.unpack_from(self.data, offset)
+        offset += RECORD.size
+        stems = [STEM_RECORD.unpack_from(self.data, offset + j * STEM_RECORD.size) for j in range(number_of_stems)]
+        offset += number_of_stems * STEM_RECORD.size
+        if kind == GRID_SOLUTION:
+            values = struct.unpack_from("<{}i".format(width * height), self.data, offset)
+            solution = [["" if value == UNKNOWN_VALUE else value for value in values[y * width:(y + 1) * width]]
+                        for y in range(height)]
+        else:
+            solution = None if kind == NO_SOLUTION else kind == TRUE_SOLUTION
+        return ind, width, height, stems, solution
+
+    def __iter__(self):
+        return (self[i] for i in range(self.number_of_puzzles))
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def read_directory(patterns):
+    """
+    Reads the puzzles (and their solutions, if they exist) from the files 'nurikabe<ind>.txt'.
+    :param patterns: see batch.puzzle_files
+    :return: Generator of tuples (ind, width, height, stems, solution), see write_collection.
+    """
+    for (directory, ind) in puzzle_files(patterns):
+        width, height, stems = load_nurikabe(ind, directory)
+        has_solution = exists(join(directory, "nurikabe{}solution.txt".format(ind)))
+        yield ind, width, height, stems, load_solution(ind, directory) if has_solution else None
+
+
+def write_directory(collection, directory):
+    """
+    Writes the puzzles of the collection to the files 'nurikabe<ind>.txt' and 'nurikabe<ind>solution.txt' in the
+    format of saveAndLoad.
+    :param collection: A Collection object.
+    :param directory: the directory of the files
+    :return: None
+    :raises ValueError: if two puzzles have the same index (nothing is written then)
+    """
+    indices = [ind for (ind, *_) in collection]
+    if len(set(indices)) < len(indices):
+        raise ValueError("The collection has several puzzles with the same index.")
+    for (ind, width, height, stems, solution) in collection:
+        save_nurikabe(width, height, stems, ind, directory)
+        if solution is not None:
+            save_solution(solution, ind, directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Packs the files nurikabe<ind>.txt into a collection, or unpacks it.")
+    parser.add_argument("collection", help="the collection file")
+    parser.add_argument("puzzles", nargs="*", help="directories or glob patterns of the files nurikabe<ind>.txt")
+    parser.add_argument("--unpack", metavar="DIRECTORY", help="write the puzzles of the collection to the directory")
+    arguments = parser.parse_args()
+    if arguments.unpack is not None:
+        with Collection(arguments.collection) as puzzles:
+            write_directory(puzzles, arguments.unpack)
+    else:
+        print(write_collection(arguments.collection, read_directory(arguments.puzzles)), "puzzles")
@@ -1,4 +1,3 @@
 SEA = 0
 assert SEA <= 0     # positive ID-s are reserved for proper islands
-
-DEBUG = 0          # verbosity level of prints
+UNKNOWN = SEA - 1   # component of the fields whose colour is not known yet
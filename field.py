@@ -2,20 +2,31 @@ from constants import *
 
 
 class Field:
-    def __init__(self, x, y, neighbours, id_number, island=None):
+    def __init__(self, x, y, neighbours, id_number, board, components):
         """
-        Constructor for this class.
+        Constructor for this class. A field is a view of the field (x, y) of the board, used for printing.
         :param x: x-coordinate of the field
         :param y: y-coordinate of the field
         :param neighbours: list of neighbours (of type Field) of the field
-        :param island: A proper island (or sea) which the field belongs to (of type Island)
+        :param id_number: index of the field in the board
+        :param board: The board (of type Board) that stores the state of the field.
+        :param components: dictionary {component: island} of the islands (of type Island) on the board
         :return: A Field object
         """
         self.x = x
         self.y = y
         self.neighbours = neighbours
-        self.island = island
         self.id = id_number
+        self.board = board
+        self.components = components
+
+    @property
+    def island(self):
+        """
+        :return: A proper island (or sea) which the field belongs to (of type Island), or None, if it is unknown.
+        """
+        component = self.board.component[self.id]
+        return None if component == UNKNOWN else self.components[component]
 
     def __repr__(self):
         return "F({}, {})".format(self.x, self.y)
@@ -35,13 +46,13 @@ class Field:
             return "{: >2}".format(self.island.final_size) if condensed else "({: >2},{: >2})".format(self.island.final_size, self.island.component)
 
     def is_part_of_proper_island(self):
-        return self.island is not None and self.island.final_size != SEA
+        return self.board.is_proper_island(self.id)
 
     def is_part_of_sea(self):
-        return self.island is not None and self.island.final_size == SEA
+        return self.board.is_sea(self.id)
 
     def has_no_island(self):
-        return self.island is None
+        return self.board.is_unknown(self.id)
 
     def get_island_final_size(self):
         return "" if self.island is None else self.island.final_size
@@ -0,0 +1,273 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from random import Random
+from nurikabe import *
+from saveAndLoad import *
+
+
+class _TooHard(Exception):
+    pass
+
+
+def island_weight(island_sizes, islands):
+    """
+    :param island_sizes: dictionary {size: weight}
+    :param islands: iterable of masks of islands
+    :return: The product of the weights of the sizes of the islands (a missing size has weight 0).
+    """
+    weight = 1
+    for island in islands:
+        weight *= island_sizes.get(island.bit_count(), 0)
+    return weight
+
+
+def allowed_sizes(board, sea, max_island_size=None, island_sizes=None):
+    """
+    Checks the sizes of all the islands of a solution. The changes of toggle only prevent an island from growing
+    too big, so the islands of the starting grid, and the parts of a carved island, are not checked by them.
+    :param board: A Board object (used for its geometry only).
+    :param sea: the mask of the sea
+    :param max_island_size: see toggle
+    :param island_sizes: see toggle
+    :return: True if no island is bigger than max_island_size, and no island has weight 0, False otherwise.
+    """
+    islands = list(board.parts(board.full_mask ^ sea))
+    if max_island_size is not None and any(island.bit_count() > max_island_size for island in islands):
+        return False
+    return island_sizes is None or island_weight(island_sizes, islands) > 0
+
+
+def toggle(board, sea, field, max_island_size=None, island_sizes=None, random=None):
+    """
+    Changes the colour of the field in a solution, if the result is still a solution: a sea field becomes an island
+    field, if the sea remains connected and the island is not too big, and an island field becomes a sea field,
+    if it touches the sea and no 2 x 2 sea area is created. The islands are the connected parts of the non-sea
+    fields.
+
+    If island_sizes is given, the change is also a step of a Metropolis random walk: it is accepted with the
+    probability min(1, weight after / weight before), where the weight is the product of the weights of the sizes
+    of the islands that the change affects (see island_weight). A change between two states of weight 0 is
+    accepted, so that the walk can leave a solution with the unwanted sizes.
+    :param board: A Board object (used for its geometry only).
+    :param sea: the mask of the sea
+    :param field: index of the field
+    :param max_island_size: None or the maximal size of an island
+    :param island_sizes: None or a dictionary {size: weight}, the relative weights of the island sizes
+    :param random: A Random object, needed if island_sizes is given.
+    :return: The mask of the new sea, or None if the colour cannot be changed.
+    """
+    bit = 1 << field
+    land = board.full_mask ^ sea
+    if sea & bit:
+        if not board.is_connected(sea ^ bit):
+            return None
+        island = board.flood(bit, land | bit)
+        if max_island_size is not None and island.bit_count() > max_island_size:
+            return None
+        new_sea, before, after = sea ^ bit, island ^ bit, island
+    elif sea & board.neighbour_masks[field] and not any(sea & square == square for square in board.square_masks[field]):
+        island = board.flood(bit, land)
+        new_sea, before, after = sea | bit, island, island ^ bit
+    else:
+        return None
+    if island_sizes is not None and \
+            random.random() * island_weight(island_sizes, board.parts(before)) > \
+            island_weight(island_sizes, board.parts(after)):
+        return None
+    return new_sea
+
+
+def random_solution(board, random, max_island_size=None, island_sizes=None, moves=20, merge_rate=1.0,
+                    carve_rate=1.0):
+    """
+    Creates a random solution of a nurikabe. The solution starts as a grid of 2 x 2 islands, separated by
+    sea lines. Then, in every round, the fields are visited in a random order, and the colour of a sea field is
+    changed with the probability merge_rate, the colour of an island field with the probability carve_rate, if
+    this is possible (see toggle).
+    :param board: A Board object (used for its geometry only).
+    :param random: A Random object.
+    :param max_island_size: see toggle
+    :param island_sizes: see toggle
+    :param moves: the number of the rounds
+    :param merge_rate: the probability that a change of a sea field is attempted
+    :param carve_rate: the probability that a change of an island field is attempted
+    :return: The mask of the sea.
+    """
+    width = board.width
+    sea = sum(1 << (y * width + x) for y in range(board.height) for x in range(width) if x % 3 == 2 or y % 3 == 2)
+    fields = list(range(board.number_of_fields))
+    for _ in range(moves):
+        random.shuffle(fields)
+        for field in fields:
+            if random.random() < (merge_rate if sea >> field & 1 else carve_rate):
+                new_sea = toggle(board, sea, field, max_island_size, island_sizes, random)
+                if new_sea is not None:
+                    sea = new_sea
+    return sea
+
+
+def place_stems(board, sea, stems, random):
+    """
+    Places one stem on every island of the solution: an island keeps the first of the given stems that lies on it,
+    the other islands get a stem at a random field.
+    :param board: A Board object (used for its geometry only).
+    :param sea: the mask of the sea
+    :param stems: List of triples (x, y, size).
+    :param random: A Random object.
+    :return: List of triples (x, y, size).
+    """
+    stem_fields = [board.index(x, y) for (x, y, _) in stems]
+    new_stems = []
+    for island in board.parts(board.full_mask ^ sea):
+        field = next((field for field in stem_fields if island >> field & 1), None)
+        if field is None:
+            field = random.choice(list(iterate_bits(island)))
+        new_stems.append(board.coordinates(field) + (island.bit_count(),))
+    return new_stems
+
+
+def unique_puzzle(width, height, seed, max_island_size=None, max_adjustments=30, max_nodes=3000, island_sizes=None):
+    """
+    Creates a random solution and its stems, and adjusts them until the nurikabe has a unique solution.
+    If the nurikabe has another solution, either the stem of an island is moved to a field where the other
+    solution differs from the intended one (which rules the other solution out), or the colour of such a field is
+    changed in the intended solution (see toggle).
+    :param width: The width of the nurikabe.
+    :param height: The height of the nurikabe.
+    :param seed: the seed of the random generator
+    :param max_island_size: see toggle
+    :param max_adjustments: the maximal number of the adjustments
+    :param max_nodes: the maximal number of nodes of one uniqueness check
+    :param island_sizes: see toggle
+    A solution with an island that is too big or has weight 0 (see allowed_sizes) is discarded.
+    :return: (stems, solution) or None, if no unique nurikabe was found.
+    """
+    random = Random(seed)
+    board = Board(width, height, [])
+    sea = random_solution(board, random, max_island_size, island_sizes)
+    if not allowed_sizes(board, sea, max_island_size, island_sizes):
+        return None
+    stems = place_stems(board, sea, [], random)
+    for _ in range(max_adjustments + 1):
+        intended = [SEA] * board.number_of_fields
+        for component, (x, y, _) in enumerate(stems, 1):
+            for field in iterate_bits(board.flood(1 << board.index(x, y), board.full_mask ^ sea)):
+                intended[field] = component
+        nurikabe = Nurikabe(width, height, stems, None, verbose=False)
+
+        def on_node(searching, depth):
+            if searching.stats.nodes >= max_nodes:
+                raise _TooHard()
+
+        nurikabe.on_node = on_node
+        solutions = nurikabe.iter_solutions()
+        try:
+            other = next((grid for grid in solutions if sum(grid, []) != intended), None)
+        except _TooHard:
+            return None
+        finally:
+            solutions.close()
+        if other is None:
+            sizes = [SEA if component == SEA else stems[component - 1][2] for component in intended]
+            return stems, [sizes[y * width:(y + 1) * width] for y in range(height)]
+        other = sum(other, [])
+        if random.random() < 0.5:
+            # move the stem of an island to a field that is not part of it in the other solution
+            field = random.choice([field for (field, component) in enumerate(intended)
+                                   if component != SEA and other[field] != component])
+            component = intended[field]
+            stems[component - 1] = board.coordinates(field) + (stems[component - 1][2],)
+        else:
+            # change the colour of a field where the solutions differ
+            differences = [field for field in range(board.number_of_fields)
+                           if (intended[field] == SEA) != (other[field] == SEA)]
+            random.shuffle(differences)
+            new_seas = (toggle(board, sea, field, max_island_size, island_sizes, random) for field in differences)
+            sea = next((new_sea for new_sea in new_seas if new_sea is not None), sea)
+            if not allowed_sizes(board, sea, max_island_size, island_sizes):
+                return None
+            stems = place_stems(board, sea, stems, random)
+    return None
+
+
+def _try_seed(width, height, seed, options):
+    return seed, unique_puzzle(width, height, seed, **options)
+
+
+def generate(number, width, height, processes=None, directory="", start_index=0, seed=0, max_island_size=None,
+             output=sys.stdout, max_adjustments=30, max_nodes=3000, island_sizes=None):
+    """
+    Generates nurikabes with unique solutions in parallel and saves them to the files 'nurikabe<ind>.txt' and
+    'nurikabe<ind>solution.txt'.
+    :param number: the number of the nurikabes
+    :param width: The width of the nurikabes.
+    :param height: The height of the nurikabes.
+    :param processes: the number of processes (by default, the number of processors)
+    :param directory: the directory of the files
+    :param start_index: the index of the first nurikabe
+    :param seed: the first seed; the attempts use the seeds seed, seed + 1, ...
+    :param max_island_size: see toggle
+    :param output: file-like object that the progress is reported to
+    :param max_adjustments: see unique_puzzle
+    :param max_nodes: see unique_puzzle
+    :param island_sizes: see toggle
+    :return: A dictionary with the number of nurikabes, attempts, wall time and the generation rate.
+    """
+    start = time.perf_counter()
+    processes = processes or os.cpu_count()
+    attempts = generated = 0
+    next_seed = seed
+    pool = ProcessPoolExecutor(processes)
+    running = set()
+    options = {"max_island_size": max_island_size, "max_adjustments": max_adjustments, "max_nodes": max_nodes,
+               "island_sizes": island_sizes}
+    while generated < number:
+        while len(running) < 2 * processes:
+            running.add(pool.submit(_try_seed, width, height, next_seed, options))
+            next_seed += 1
+        done, running = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            attempts += 1
+            _, puzzle = future.result()
+            if puzzle is not None and generated < number:
+                stems, solution = puzzle
+                save_nurikabe(width, height, stems, start_index + generated, directory)
+                save_solution(solution, start_index + generated, directory)
+                generated += 1
+                print("generated {}/{}, {:.2f} nurikabes/s".format(generated, number,
+                                                                   generated / (time.perf_counter() - start)),
+                      file=output, flush=True)
+    wall_time = time.perf_counter() - start
+    # the attempts that are still running are not needed anymore
+    pool.shutdown(wait=False, cancel_futures=True)
+    return {"nurikabes": generated, "attempts": attempts, "wall_time": wall_time, "rate": generated / wall_time}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates nurikabes with unique solutions.")
+    parser.add_argument("width", type=int)
+    parser.add_argument("height", type=int)
+    parser.add_argument("number", type=int, help="the number of the nurikabes")
+    parser.add_argument("-p", "--processes", type=int, default=None, help="the number of processes")
+    parser.add_argument("-d", "--directory", default="", help="the directory of the generated files")
+    parser.add_argument("--start", type=int, default=0, help="the index of the first nurikabe")
+    parser.add_argument("--seed", type=int, default=0, help="the first seed of the random generator")
+    parser.add_argument("--max-island-size", type=int, default=None, help="the maximal size of an island")
+    parser.add_argument("--island-sizes", default=None,
+                        help="the relative weights of the island sizes, e.g. '1:1,2:2,3:2,4:1' (the other sizes "
+                             "are not used)")
+    parser.add_argument("--max-adjustments", type=int, default=30,
+                        help="the maximal number of the adjustments of one attempt")
+    parser.add_argument("--max-nodes", type=int, default=3000,
+                        help="the maximal number of nodes of one uniqueness check")
+    arguments = parser.parse_args()
+    sizes = None
+    if arguments.island_sizes is not None:
+        sizes = {int(size): float(weight) for (size, weight) in (pair.split(":")
+                                                                 for pair in arguments.island_sizes.split(","))}
+    print(generate(arguments.number, arguments.width, arguments.height, arguments.processes, arguments.directory,
+                   arguments.start, arguments.seed, arguments.max_island_size, sys.stdout, arguments.max_adjustments,
+                   arguments.max_nodes, sizes))
@@ -0,0 +1,123 @@
+from random import Random
+from board import *
+from constants import *
+
+
+class Heuristic:
+    name = "mrv"
+
+    def __init__(self, sea_first=False):
+        """
+        Constructor for this class. A branching heuristic chooses the field to branch on (see choose) and the order
+        of its components (see order). This one chooses a field with the smallest domain (minimum remaining
+        values), and among them the one with the closest island.
+        :param sea_first: Should the sea be tried before the islands (by default, it is tried last).
+        :return: A Heuristic object.
+        """
+        self.sea_first = sea_first
+        if sea_first:
+            self.name += "-sea-first"
+
+    @staticmethod
+    def candidates(nurikabe, mask):
+        """
+        :param nurikabe: A Nurikabe object.
+        :param mask: the mask of the unknown fields
+        :return: List of pairs (field, feasible components), see Nurikabe.feasible_components.
+        """
+        board = nurikabe.board
+        return [(field, nurikabe.feasible_components(*board.coordinates(field))) for field in iterate_bits(mask)]
+
+    def choose(self, nurikabe, smallest):
+        """
+        Chooses the field to branch on. It is called only when no domain has less than two options.
+        :param nurikabe: A Nurikabe object.
+        :param smallest: the mask of the unknown fields with the smallest domain
+        :return: (field, feasible components)
+        """
+        return min(self.candidates(nurikabe, smallest),
+                   key=lambda t: (len(t[1]), t[1][0]) if len(t[1]) > 1 else (len(t[1]), ))
+
+    def order(self, nurikabe, field, components):
+        """
+        :param nurikabe: A Nurikabe object.
+        :param field: the chosen field
+        :param components: its feasible components, sorted by the distance (sea last)
+        :return: The components in the order in which they are tried.
+        """
+        if self.sea_first and components and components[-1][1] == SEA:
+            return components[-1:] + components[:-1]
+        return components
+
+
+class DegreeHeuristic(Heuristic):
+    name = "mrv-degree"
+
+    def choose(self, nurikabe, smallest):
+        """
+        Chooses a field with the smallest domain, and among them the one with the most unknown neighbours.
+        """
+        board = nurikabe.board
+        return min(self.candidates(nurikabe, smallest),
+                   key=lambda t: (len(t[1]), -(board.neighbour_masks[t[0]] & board.unknown_mask).bit_count(), t[0]))
+
+
+class SmallestIslandHeuristic(Heuristic):
+    name = "smallest-island"
+
+    def choose(self, nurikabe, smallest):
+        """
+        Chooses a field with the smallest domain among the unknown neighbours of the unfinished island that misses
+        the fewest fields.
+        """
+        board = nurikabe.board
+        unfinished = [(board.possible_expansion(component), component)
+                      for component in range(1, board.number_of_islands + 1) if board.possible_expansion(component)]
+        for (_, component) in sorted(unfinished):
+            neighbours = board.expand(board.island_masks[component]) & board.unknown_mask
+            if neighbours:
+                return min(self.candidates(nurikabe, neighbours), key=lambda t: (len(t[1]), t[0]))
+        return Heuristic.choose(self, nurikabe, smallest)
+
+
+class SeaRegionHeuristic(Heuristic):
+    name = "constrained-sea"
+
+    def choose(self, nurikabe, smallest):
+        """
+        Chooses a field with the smallest domain among the unknown neighbours of the part of the sea with the
+        fewest of them.
+        """
+        board = nurikabe.board
+        exits = [board.expand(part) & board.unknown_mask for part in board.parts(board.sea_mask)]
+        exits = [mask for mask in exits if mask]
+        if not exits:
+            return Heuristic.choose(self, nurikabe, smallest)
+        fewest = min(exits, key=lambda mask: (mask.bit_count(), mask))
+        return min(self.candidates(nurikabe, fewest), key=lambda t: (len(t[1]), t[0]))
+
+
+class RandomHeuristic(Heuristic):
+    name = "random"
+
+    def __init__(self, seed=0, sea_first=False):
+        """
+        Constructor for this class. Chooses a field with the smallest domain, and breaks the ties randomly. The choices
+        are determined by the seed, but they depend on the whole history of the search, so such a search cannot be
+        resumed from a checkpoint.
+        :param seed: the seed of the random generator
+        :param sea_first: see Heuristic
+        :return: A RandomHeuristic object.
+        """
+        super().__init__(sea_first)
+        self.name += "-{}".format(seed)
+        self.seed = seed
+        self.random = Random(seed)
+
+    def choose(self, nurikabe, smallest):
+        return min(self.candidates(nurikabe, smallest), key=lambda t: (len(t[1]), self.random.random()))
+
+
+# the heuristics that are compared by benchmark.py --heuristics
+HEURISTICS = {heuristic.name: heuristic for heuristic in [Heuristic(), Heuristic(sea_first=True), DegreeHeuristic(),
+                                                          SmallestIslandHeuristic(), SeaRegionHeuristic()]}
@@ -1,19 +1,34 @@
 from constants import *
+from board import iterate_bits
 
 
 class Island:
-    def __init__(self, fields, final_size, component):
+    def __init__(self, board, final_size, component, id_to_field):
         """
-        Constructor for this class.
-        :param fields: A set of fields (of type Field), for which we know they are part of the island. Typically,
-        len(fields) would be 1 (proper island) or 0 (sea).
+        Constructor for this class. An island is a view of one component of the board, used for printing.
+        :param board: The board (of type Board) that stores the fields of the island.
         :param final_size: For a proper island, this is the final size of the island, for sea, this is constants.SEA.
         :param component: ID-like positive integer (proper island) or SEA (sea).
+        :param id_to_field: dictionary {field id: field} of the fields (of type Field) on the board
         :return: An Island object.
         """
-        self.fields = fields
+        self.board = board
         self.final_size = final_size
         self.component = component
+        self.id_to_field = id_to_field
+
+    def mask(self):
+        """
+        :return: The bitmask of the fields that are part of the island (or sea).
+        """
+        return self.board.sea_mask if self.component == SEA else self.board.island_masks[self.component]
+
+    @property
+    def fields(self):
+        """
+        :return: A set of fields (of type Field), for which we know they are part of the island.
+        """
+        return {self.id_to_field[index] for index in iterate_bits(self.mask())}
 
     def __repr__(self):
         island_type = "Island" if self.component != SEA else "Sea"
@@ -26,7 +41,7 @@ class Island:
         :return: The number of fields in the island.
         """
         assert self.component != SEA
-        return len(self.fields)
+        return self.board.island_sizes[self.component]
 
     def possible_expansion(self):
         """
@@ -1,11 +1,16 @@
 from field import *
 from island import *
+from board import *
 from constants import *
-from heapq import *
+from stats import *
+from heuristics import *
+from budget import *
+import os
+import time
 
 
 class Nurikabe:
-    def __init__(self, width, height, islands_stems, pencil_paper_solution):
+    def __init__(self, width, height, islands_stems, pencil_paper_solution, verbose=True, collect_solutions=False):
         """
         Contructor for the class Nurikabe.
         :param width: The width of the Nurikabe. The x-coordinates of the fields should be in the interval [0, width).
@@ -21,51 +26,67 @@ class Nurikabe:
          \/
         :param pencil_paper_solution: A list of length height, where each element is a list of length width and
         pencil_paper_solution[i][j] is SEA, island's size or ''.
+        :param verbose: Should the progress and the solutions be printed.
+        :param collect_solutions: Should the solutions (see Board.grid) be collected in the list solutions.
         :return: A Nurikabe object.
+
+        The statistics of the search are collected in stats (see Stats). The callbacks on_node(nurikabe, depth),
+        on_solution(nurikabe) and on_backtrack(nurikabe, field, component) are called (if they are not None) when
+        a node of the search tree is entered, when a solution is found, and when a branch is reverted.
+        The field to branch on and the order of its components are chosen by heuristic (see Heuristic).
+        If budget is set (see Budget), it is checked at every node of the search (see solve_with_budget).
         """
         self.width = width
         self.height = height
-        self.fields = [[Field(x, y, [], y * self.width + x) for x in range(self.width)] for y in range(self.height)]
-        self.id_to_field = {field.id: field for line in self.fields for field in line}
-        self.unknown = {field for line in self.fields for field in line}
-        self.islands = []
+        self.islands_stems = islands_stems
+        self.verbose = verbose
+        self.board = Board(width, height, islands_stems)
         self.components = {}  # {id1: island1, id2: island2, ...}
+        self.id_to_field = {}
+        self.fields = [[Field(x, y, [], y * self.width + x, self.board, self.components) for x in range(self.width)]
+                       for y in range(self.height)]
+        self.id_to_field.update({field.id: field for line in self.fields for field in line})
+        self.islands = []
         # create islands
-        component_counter = 1
-        for (x, y, size) in islands_stems:
-            if DEBUG > 0:
-                print("(x, y, size)", x, y, size)
-            field = self.fields[y][x]
-            island = Island({field}, size, component_counter)
-            self.components[component_counter] = island
-            field.island = island
+        for component, (x, y, size) in enumerate(islands_stems, 1):
+            island = Island(self.board, size, component, self.id_to_field)
+            self.components[component] = island
             self.islands.append(island)
-            self.unknown.remove(field)
-            component_counter += 1
 
         self.number_of_steps = 0
-        self.show_partial_solution("", condensed=True)
+        if self.verbose:
+            self.show_partial_solution("", condensed=True)
         # set neighbours
-        for y in range(self.height):
-            for x in range(self.width):
-                if x > 0:
-                    self.fields[y][x].neighbours.append(self.fields[y][x - 1])
-                if x < self.width - 1:
-                    self.fields[y][x].neighbours.append(self.fields[y][x + 1])
-                if y > 0:
-                    self.fields[y][x].neighbours.append(self.fields[y - 1][x])
-                if y < self.height - 1:
-                    self.fields[y][x].neighbours.append(self.fields[y + 1][x])
+        for field in self.id_to_field.values():
+            field.neighbours.extend(self.id_to_field[i] for i in self.board.neighbours[field.id])
         # create sea
-        self.sea = Island(set(), SEA, SEA)
-        self.components[0] = self.sea
+        self.sea = Island(self.board, SEA, SEA, self.id_to_field)
+        self.components[SEA] = self.sea
         self.number_feasible_solutions = 0
+        self.collect_solutions = collect_solutions
+        self.solutions = []
+        # cached domains of the unknown fields, see domain
+        self.domains = {}  # {index: (reachable islands, can be sea)}
+        self.domain_log = []  # [(length of the trail, index, previous domain or None), ...]
+        self.domain_mask = 0  # the mask of the fields in domains
+        self.domain_size_masks = [0] * (len(islands_stems) + 2)  # [mask of the fields with the domain of size i, ...]
         # pencil and paper solution
         self.pencil_paper_solution = pencil_paper_solution
-        if self.pencil_paper_solution is not None and DEBUG > 0:
-            print("My solution:")
-            for i, x in enumerate(self.pencil_paper_solution):
-                print(x, i)
+        # statistics and callbacks
+        self.stats = Stats()
+        self.depth = 0
+        self.on_node = None
+        self.on_solution = None
+        self.on_backtrack = None
+        self.heuristic = Heuristic()
+        self.budget = None
+
+    @property
+    def unknown(self):
+        """
+        :return: The set of the fields (of type Field) whose colour is not known yet.
+        """
+        return {self.id_to_field[index] for index in iterate_bits(self.board.unknown_mask)}
 
     def check_partial_solution(self):
         """
@@ -93,44 +114,12 @@ class Nurikabe:
         :return: List of pairs (island, dist(island, (x, y))), sorted increasingly by distance. Distance is the
         minimal number of fields of the unknown colour that connect the island and the field (x, y) (>= 1).
         """
-        is_candidate = (lambda o: True) if the_island is None else (lambda o: o == the_island)
+        index = self.board.index(x, y)
         nearby = []
-        distance_xy_island = {island: float("inf") for island in self.islands}
-        for island in self.islands:
-            island_too_far = not is_candidate(island)
-            for starting_field in island.fields:
-                if island_too_far:
-                    break
-                # simplified Dijkstra's algorithm
-                is_processed = {field.id: False for line in self.fields for field in line}
-
-                to_be_processed = []  # [[distance to the field, field id], ...]
-                heappush(to_be_processed, [0, starting_field.id])
-
-                is_processed[starting_field.id] = True
-
-                found_xy = False
-                while to_be_processed and to_be_processed[0][0] < island.possible_expansion() and not found_xy:
-                    dist, field_id = heappop(to_be_processed)
-                    for neighbour in self.id_to_field[field_id].neighbours:
-                        if neighbour.x == x and neighbour.y == y:
-                            # island remains the candidate for nearby islands
-                            found_xy = True
-                            distance_xy_island[island] = min(distance_xy_island[island], dist + 1)
-                            break
-                        elif (not is_processed[neighbour.id]) and (neighbour.has_no_island() or neighbour in island.fields):
-                            heappush(to_be_processed, [dist + neighbour.has_no_island(), neighbour.id])
-                            # is_precessed[neighbour.id] can be set to True: if neighbour happends to be
-                            # a candidate again later on, the distance will be equal or greater to the current distance
-                            is_processed[neighbour.id] = True
-                    if found_xy:
-                        break
-
-                if not found_xy:
-                    island_too_far = True
-                    break
-            if not island_too_far:
-                nearby.append((island, distance_xy_island[island]))
+        for island in self.islands if the_island is None else [the_island]:
+            distance = self.board.island_reach(island.component).get(index)
+            if distance is not None:
+                nearby.append((island, distance))
         nearby.sort(key=lambda isl: isl[-1])
         return nearby
 
@@ -145,178 +134,301 @@ class Nurikabe:
         are guarateed to be fullfiled.
         :return: Logic value of the proposition 'The solution is feasible.'
         """
-        for island in self.islands:
-            if not island.has_final_size():
+        board = self.board
+        for component in range(1, board.number_of_islands + 1):
+            if board.possible_expansion(component) != 0 or not board.is_connected(board.island_masks[component]):
                 return False
-            else:  # is connected?
-                for field in island.fields:
-                    break
-                stack = [field]
-                processed = {field}
-                while stack:
-                    top = stack.pop()
-                    for neighbour in top.neighbours:
-                        if neighbour not in processed:
-                            processed.add(neighbour)
-                            stack.append(neighbour)
-                if processed != island.fields:
-                    return False
-        black_fields = 0
-        starting_point = None
-        for x in range(self.width):
-            for y in range(self.height):
-                if self.fields[y][x].is_part_of_sea():
-                    if black_fields == 0:
-                        starting_point = self.fields[y][x]
-                    black_fields += 1
-        if black_fields > 0:
-            seen = set()
-            stack = [starting_point]
-            while stack:
-                field = stack.pop()
-                for neighbour in field.neighbours:
-                    if neighbour not in seen and neighbour.is_part_of_sea():
-                        seen.add(neighbour)
-                        stack.append(neighbour)
-                        if len(seen) == black_fields:
-                            return True
-            return False
-        else:
-            return True
+        return board.is_connected(board.sea_mask)
 
     def feasible_components(self, xx, yy, offset=""):
         """
         Computes he list of components (islands or sea) that the field with coordinates (xx, yy) could be part of.
         :param xx: x-coordinate of the field
         :param yy: y-coordinate of the field
-        :param offset: string, used for nicer printing in debugging
+        :param offset: ignored (it was used for printing in debugging)
         :return: A list [(dist, component), ...] sorted increasingly by dist, where dist is the distance between
          (xx, yy) and the component in the case of proper island, and float('inf') in the case of the sea.
         """
-        feasible_comp = []
-        if DEBUG > 3:
-            print(offset, "Computing components for", (xx, yy))
-        # First, we find proper island candidates. We must check, whether the sea (if exists) remains connected.
+        index = self.board.index(xx, yy)
+        islands, can_be_sea = self.domain(index)
+        # We must check, whether the sea (if exists) remains connected.
         # When there is only one black field and it is completely surrounded by islands, we will fail to discover
         # this already in this step.
-        must_see = 0
-        black_field = None
-        for x in range(self.width):
-            for y in range(self.height):
-                if self.fields[y][x].is_part_of_sea():
-                    if must_see == 0:
-                        black_field = self.fields[y][x]
-                    must_see += 1
-        can_be_island = True
-        if must_see > 0:
-            if DEBUG > 3:
-                print(offset, "Have to find {} black field(s).".format(must_see))
-            processed_nonwhite_fields = {black_field}
-            seen = 1
-            stack = [black_field]
-            while stack and seen < must_see:
-                if DEBUG > 5:
-                    print(offset, "Removing the top from the stack:", stack)
-                top = stack.pop()
-                for neighbour in top.neighbours:
-                    if DEBUG > 5:
-                        print(offset, "neighbour", neighbour)
-                    if not(neighbour in processed_nonwhite_fields or neighbour.is_part_of_proper_island() or (neighbour.x == xx and neighbour.y == yy)):
-                        if DEBUG > 5:
-                            print(offset, "goes to stack ...")
-                        stack.append(neighbour)
-                        processed_nonwhite_fields.add(neighbour)
-                        if neighbour.is_part_of_sea():
-                            if DEBUG > 5:
-                                print(offset, "is also black")
-                            seen += 1
-            assert must_see >= seen
-            can_be_island = must_see == seen
-            if can_be_island:
-                if DEBUG > 3:
-                    print(offset, "Can be island, found all sea fields.")
-            else:
-                if DEBUG > 3:
-                    print(offset, "Must not be island1")
-        else:
-            if DEBUG > 3:
-                print(offset, "No sea --> can be island.")
-        if can_be_island:
-            # check which islands are the candidates
-            neighbouring_islands = set(neighbour.island.component for neighbour in self.fields[yy][xx].neighbours if neighbour.is_part_of_proper_island())
-            if len(neighbouring_islands) > 1:
-                can_be_island = False  # more than 1 neighbouring island --> (xx, yy) cannot be part of an island
-                if DEBUG > 3:
-                    print(offset, "Cannot be part of the island (more than 1 neighbouring island)")
-            elif len(neighbouring_islands) == 1:
-                if DEBUG > 3:
-                    print(offset, "1 neighbouring island", end="")
-                for component in neighbouring_islands:  # get x for {x} ...
-                    island = self.components[component]
-                    if not island.has_final_size():
-                        candidate_islands = self.nearby_islands(xx, yy, island)
-                        assert candidate_islands == [] or candidate_islands == [(island, 1)]
-                        if DEBUG > 3:
-                            print(" which is a candidate", island)
-                    else:
-                        can_be_island = False
-                        if DEBUG > 3:
-                            print(" which is not a candidate", island)
-            else:  # no neighbouring islands
-                candidate_islands = self.nearby_islands(xx, yy)
-                if DEBUG > 3:
-                    print(offset, "No neighbouring islands, candidates:", candidate_islands)
-        if can_be_island:
-            feasible_comp += [(dist, island.component) for (island, dist) in candidate_islands]
-
-        # Secondly, we check, whether (xx, yy) can be part of the sea.
+        if islands and self.board.separates_sea(index):
+            islands = []
+        feasible_comp = list(islands)
+        if can_be_sea:
+            feasible_comp.append((float("inf"), SEA))
+        return feasible_comp
+
+    def domain(self, index):
+        """
+        Computes the domain of the unknown field, i.e., the results of reachable_islands and can_be_sea.
+        The domain is cached until an assignment at most two fields away from the field, or an assignment that
+        changes the reach of an island that the field was within, and restored when this assignment is reverted.
+        :param index: index of the field
+        :return: A pair (reachable islands, can be sea).
+        """
+        domain = self.domains.get(index)
+        if domain is None:
+            domain = (self.reachable_islands(index), self.can_be_sea(index))
+            self._set_domain(index, domain)
+            self.domain_log.append((len(self.board.trail), index, None))
+        return domain
+
+    def compute_domains(self, mask):
+        """
+        Computes (and caches) the domains of the unknown fields in mask, like domain, but for all of them at once:
+        the fields that touch two islands, or a complete island, or an island other than the one whose reach they are
+        in, are found with a few mask operations, and the reaches are visited once per island, instead of once per
+        field and island.
+        :param mask: mask of unknown fields whose domains are not cached
+        :return: None
+        """
+        board = self.board
+        islands = {index: [] for index in iterate_bits(mask)}
+        # the islands that touch the fields
+        contacts = board.island_contacts(mask)
+        for component in range(1, board.number_of_islands + 1):
+            reach_mask = board.reach_mask(component) & mask
+            if not reach_mask:
+                continue
+            if contacts[0][component] and board.possible_expansion(component) == 0:
+                continue
+            reach_mask &= ~board.touching_others(contacts, component)
+            reach = board.island_reach(component)
+            for index in iterate_bits(reach_mask):
+                islands[index].append((reach[index], component))
+        sea_bans = board.sea_bans()
+        position = len(board.trail)
+        for index, candidates in islands.items():
+            candidates.sort(key=lambda candidate: candidate[0])
+            self._set_domain(index, (candidates, not sea_bans >> index & 1))
+            self.domain_log.append((position, index, None))
+
+    def _set_domain(self, index, domain):
+        """
+        Caches the domain (or forgets it, if domain is None) of the field.
+        :param index: index of the field
+        :param domain: A pair (reachable islands, can be sea) or None.
+        :return: None
+        """
+        bit = 1 << index
+        if index in self.domains:
+            old_islands, old_can_be_sea = self.domains[index]
+            self.domain_size_masks[len(old_islands) + old_can_be_sea] ^= bit
+            self.domain_mask ^= bit
+            del self.domains[index]
+        if domain is not None:
+            self.domains[index] = domain
+            self.domain_size_masks[len(domain[0]) + domain[1]] |= bit
+            self.domain_mask |= bit
+
+    def assign(self, index, component):
+        """
+        Assigns the unknown field to the given component (see Board.assign) and forgets the domains that might have
+        changed because of that.
+        :param index: index of the field
+        :param component: component of the field
+        :return: None
+        """
+        board = self.board
+        board.assign(index, component)
+        dirty = (board.vicinity_masks[index] | board.reach_changes) & self.domain_mask
+        board.reach_changes = 0
+        position = len(board.trail)
+        for field in iterate_bits(dirty):
+            self.domain_log.append((position, field, self.domains[field]))
+            self._set_domain(field, None)
+
+    def unassign(self):
+        """
+        Reverts the last assignment (see Board.unassign) and restores the domains from before it.
+        :return: The index of the field that is unknown again.
+        """
+        index = self.board.unassign()
+        position = len(self.board.trail)
+        while self.domain_log and self.domain_log[-1][0] > position:
+            _, field, previous = self.domain_log.pop()
+            self._set_domain(field, previous)
+        return index
+
+    def undo(self, mark):
+        """
+        Reverts all the assignments that were made after the trail had length mark.
+        :param mark: the length of the trail that we return to
+        :return: None
+        """
+        while len(self.board.trail) > mark:
+            self.unassign()
+
+    def island_candidates(self, index):
+        """
+        Computes the list of proper islands that the unknown field could be part of.
+        :param index: index of the field
+        :return: A list [(dist, component), ...] sorted increasingly by dist, where dist is the distance between
+         the field and the island.
+        """
+        if self.board.separates_sea(index):
+            return []
+        return list(self.domain(index)[0])
+
+    def reachable_islands(self, index):
+        """
+        Computes the list of proper islands that the unknown field could be part of, if the sea is not taken into
+        account.
+        :param index: index of the field
+        :return: A list [(dist, component), ...] sorted increasingly by dist, where dist is the distance between
+         the field and the island.
+        """
+        board = self.board
+        # check which islands are the candidates
+        neighbouring_islands = set(board.component[neighbour] for neighbour in board.neighbours[index]
+                                   if board.is_proper_island(neighbour))
+        if len(neighbouring_islands) > 1:
+            # more than 1 neighbouring island --> the field cannot be part of an island
+            return []
+        elif len(neighbouring_islands) == 1:
+            island = self.components[neighbouring_islands.pop()]
+            if board.possible_expansion(island.component) == 0:
+                return []
+            candidate_islands = self.nearby_islands(*board.coordinates(index), island)
+            assert candidate_islands == [] or candidate_islands == [(island, 1)]
+        else:  # no neighbouring islands
+            candidate_islands = self.nearby_islands(*board.coordinates(index))
+        return [(dist, island.component) for (island, dist) in candidate_islands]
+
+    def can_be_sea(self, index):
+        """
+        Checks whether the unknown field could be part of the sea.
+        :param index: index of the field
+        :return: True or False
+        """
         # 1. Check it this would cause any 2 x 2 sea area
         #
         #  ? x or   x ? or  ? ?  or  ? ?
         #  ? ?      ? ?     x ?      ? x
         #
-        can_be_sea = True
-        if xx > 0:
-            if yy > 0:  # 1
-                if all([field.is_part_of_sea() for field in [self.fields[yy][xx - 1], self.fields[yy - 1][xx - 1], self.fields[yy - 1][xx]]]):
-                    can_be_sea = False
-            if yy < self.height - 1 and can_be_sea:  # 4
-                if all([field.is_part_of_sea() for field in [self.fields[yy][xx - 1], self.fields[yy + 1][xx - 1], self.fields[yy + 1][xx]]]):
-                    can_be_sea = False
-        if xx < self.width - 1 and can_be_sea:
-            if yy > 0:  # 2
-                if all([field.is_part_of_sea() for field in [self.fields[yy - 1][xx], self.fields[yy - 1][xx + 1], self.fields[yy][xx + 1]]]):
-                    can_be_sea = False
-            if yy < self.height - 1 and can_be_sea:  # 3
-                if all([field.is_part_of_sea() for field in [self.fields[yy + 1][xx], self.fields[yy + 1][xx + 1], self.fields[yy][xx + 1]]]):
-                    can_be_sea = False
         # 2. Check, whether there is an island that has not reached its final size yet, and has not enough space to do
-        #    that: will not do that, because we always try island components first.
-
+        #    that: this is checked for all the islands at once in propagate (see 8.), after the assignment.
         # 3. Chech, whether we would isolate an island field,
         #    so that it could not be connected to the rest of the island
-        if can_be_sea:
-            for neighbour in self.fields[yy][xx].neighbours:
-                if neighbour.is_part_of_proper_island() and neighbour.island.final_size > 1:
-                    expansion_directions = 0
-                    for neigh_neighbour in neighbour.neighbours:
-                        if not neigh_neighbour.is_part_of_sea():
-                            expansion_directions += 1
-                    if expansion_directions <= 1:  # we would close the only possible direction
-                        if DEBUG:
-                            print(offset, "Must not close expansion direction!")
-                        can_be_sea = False
-                        break
-        if can_be_sea:
-            feasible_comp.append((float("inf"), SEA))
-            if DEBUG > 3:
-                print(offset, "Can be sea")
+        # The checks 1. and 3. are done for the whole board at once (see Board.sea_bans).
+        return not self.board.sea_bans() >> index & 1
+
+    def force(self, index, component):
+        """
+        Assigns the field to the component, if this is allowed.
+        :param index: index of the field
+        :param component: SEA or component of a proper island
+        :return: True if the field is (or already was) part of the component, False if this is not possible.
+        """
+        board = self.board
+        if not board.is_unknown(index):
+            return board.component[index] == component
+        if component == SEA:
+            allowed = self.domain(index)[1]
         else:
-            if DEBUG > 3:
-                print(offset, "Cannot be sea")
-        if DEBUG > 3:
-            print(offset, "feasible components", feasible_comp)
-        return feasible_comp
+            allowed = any(c == component for (_, c) in self.island_candidates(index))
+        if allowed:
+            self.assign(index, component)
+        return allowed
+
+    def propagate(self):
+        """
+        Applies the following deductions until none of them applies anymore:
+        1. The unknown neighbours of a complete island are sea.
+        2. The unknown fields that touch two different islands are sea.
+        3. The unknown fields that no island can reach are sea.
+        4. A part of an island that must still grow, and has a single unknown neighbour, expands there.
+        5. A part of the sea, that has a single unknown neighbour and is not the only part of the sea, expands there.
+        6. An unknown field that would complete a 2 x 2 sea area is appended to the only island that can reach it.
+        7. The unknown fields that would disconnect the sea, if they were part of an island, are sea.
+        8. An island that must still grow needs at least as many fields within its reach (that do not touch other
+           islands) as it misses. If it has exactly that many, they are all part of it.
+        9. The islands together need at most as many fields as they can still reach.
+        The assignments are recorded on the trail of the board, so that they can be reverted by undo.
+        :return: False if a contradiction was found, True otherwise.
+        """
+        start = time.perf_counter()
+        mark = len(self.board.trail)
+        consistent = self._propagate()
+        self.stats.forced += len(self.board.trail) - mark
+        self.stats.add_time("propagate", time.perf_counter() - start)
+        return consistent
+
+    def _propagate(self):
+        stats = self.stats
+        board = self.board
+        changed = True
+        while changed and board.unknown_mask:
+            changed = False
+            unknown = board.unknown_mask
+            to_sea = 0
+            reachable = needed = 0
+            to_island = []  # [(index, component), ...]
+            contacts = board.island_contacts(unknown)
+            touching, _, touched_twice = contacts
+            for component in range(1, board.number_of_islands + 1):
+                island_mask = board.island_masks[component]
+                parts = list(board.parts(island_mask))
+                expansion = board.possible_expansion(component)
+                if expansion == 0:
+                    if len(parts) > 1:
+                        return stats.dead_end(ISOLATED_ISLAND)
+                    to_sea |= touching[component]  # 1.
+                    continue
+                # 8. the fields that touch another island cannot be part of this one
+                available = board.reach_mask(component) & ~board.touching_others(contacts, component)
+                room = available.bit_count()
+                if room < expansion:
+                    return stats.dead_end(ISOLATED_ISLAND)
+                if room == expansion:
+                    to_island.extend((field, component) for field in iterate_bits(available))
+                reachable |= available
+                needed += expansion
+                for part in parts:  # 4.
+                    exits = board.expand(part) & unknown
+                    if not exits:
+                        return stats.dead_end(ISOLATED_ISLAND)
+                    if exits & (exits - 1) == 0:
+                        to_island.append((exits.bit_length() - 1, component))
+            if needed > reachable.bit_count():  # 9.
+                return stats.dead_end(CAPACITY)
+            to_sea |= touched_twice | (unknown & ~reachable)  # 2., 3.
+            sea_parts = list(board.parts(board.sea_mask))
+            if len(sea_parts) > 1:
+                for part in sea_parts:  # 5.
+                    exits = board.expand(part) & unknown
+                    if not exits:
+                        return stats.dead_end(SEA_CUT)
+                    if exits & (exits - 1) == 0:
+                        to_sea |= exits
+            for field in iterate_bits(to_sea):
+                if not self.force(field, SEA):
+                    return stats.dead_end(CONFLICT)
+                changed = True
+            for (field, component) in to_island:
+                if not self.force(field, component):
+                    return stats.dead_end(CONFLICT)
+                changed = True
+            for field in iterate_bits(board.pool_completions()):  # 6.
+                if not board.is_unknown(field):
+                    continue
+                candidates = self.island_candidates(field)
+                if not candidates:
+                    return stats.dead_end(POOL)
+                if len(candidates) == 1:
+                    self.assign(field, candidates[0][1])
+                    changed = True
+            if not changed and board.sea_mask and board.unknown_mask:  # 7.
+                if not board.is_connected(board.sea_mask, board.sea_mask | board.unknown_mask):
+                    return stats.dead_end(SEA_CUT)
+                for field in iterate_bits(board.sea_cuts()):
+                    if not self.force(field, SEA):
+                        return stats.dead_end(CONFLICT)
+                    changed = True
+        return True
 
     def show_partial_solution(self, offset, condensed=False):
         if not condensed:
@@ -330,65 +442,303 @@ class Nurikabe:
                 print(self.fields[y][x].island_size(condensed), end="")
             print(" ", y)
     
-    def solve(self, only_untill_first_solution, offset=""):
-        if self.number_of_steps % 200 == 0:
-            print(self.number_of_steps)
-        if DEBUG:
-            print()
-            if DEBUG and self.pencil_paper_solution is not None:
-                is_ok, problematic_x, problematic_y = self.check_partial_solution()
-                ok_branch = "" if is_ok else "not ({}, {}) ".format(problematic_x, problematic_y)
-                print(offset, "I am {}in the right branch.".format(ok_branch))
-            self.show_partial_solution(offset, condensed=True)
-
-        if not self.unknown:
+    def branching(self):
+        """
+        Applies the deductions at the current node of the search tree (see propagate) and chooses the field
+        to branch on. The caller is responsible for reverting the deductions (see undo) when leaving the node.
+        :return: (is solution, field, components): is solution tells us whether the board is a feasible solution,
+         field is the index of the chosen field (or None, if there is none), and components is the list of its
+         feasible components (see feasible_components), which is empty if the node is a dead end or a solution.
+        """
+        board = self.board
+        stats = self.stats
+        stats.nodes += 1
+        if not self.propagate():
+            return False, None, []
+        if not board.unknown_mask:
             # is the solution feasible
             if self.is_feasible():
+                return True, None, []
+            return stats.dead_end(INFEASIBLE), None, []
+        start = time.perf_counter()
+        # make sure that the domains of all the unknown fields are known
+        self.compute_domains(board.unknown_mask & ~self.domain_mask)
+        # take a field with the smallest domain, if the domain has at most one option, otherwise ask the heuristic
+        for size, size_mask in enumerate(self.domain_size_masks):
+            if size_mask & board.unknown_mask:
+                break
+        if size <= 1:
+            candidates = [(field, self.feasible_components(*board.coordinates(field)))
+                          for field in iterate_bits(size_mask & board.unknown_mask)]
+            (chosen_field, components) = min(candidates, key=lambda t: len(t[1]))
+        else:
+            (chosen_field, components) = self.heuristic.choose(self, size_mask & board.unknown_mask)
+            components = self.heuristic.order(self, chosen_field, components)
+        assert board.is_unknown(chosen_field)
+        stats.add_time("choice", time.perf_counter() - start)
+        if not components:
+            stats.dead_end(NO_OPTIONS)
+        elif len(components) > 1:
+            stats.guesses += 1
+        return False, chosen_field, components
+
+    def visit(self, only_untill_first_solution):
+        """
+        Enters the current node of the search tree: reports it, applies the deductions and records the solution,
+        if the node is one (see branching).
+        :param only_untill_first_solution: see solve
+        :return: (is solution, field, components), see branching
+        """
+        if self.verbose and self.number_of_steps % 200 == 0:
+            print(self.number_of_steps)
+        if self.depth > self.stats.max_depth:
+            self.stats.max_depth = self.depth
+        if self.on_node is not None:
+            self.on_node(self, self.depth)
+        if self.budget is not None:
+            self.budget.check(self)
+        is_solution, chosen_field, components = self.branching()
+        if self.budget is not None:
+            self.budget.record(self)
+        if is_solution:
+            if self.verbose:
                 print("Found solution:")
                 self.show_partial_solution("", condensed=True)
-                self.number_feasible_solutions += 1
-                if self.pencil_paper_solution is not None:
-                    is_ok, problematic_x, problematic_y = self.check_partial_solution()
-                    print("Coincides with pencil/paper:", is_ok, problematic_x, problematic_y)
-                return only_untill_first_solution
+            self.number_feasible_solutions += 1
+            self.stats.solutions += 1
+            if self.collect_solutions:
+                self.solutions.append(self.board.grid())
+            if self.verbose and self.pencil_paper_solution is not None:
+                is_ok, problematic_x, problematic_y = self.check_partial_solution()
+                print("Coincides with pencil/paper:", is_ok, problematic_x, problematic_y)
+            if self.on_solution is not None:
+                self.on_solution(self)
+        return is_solution, chosen_field, components
+
+    def solve(self, only_untill_first_solution):
+        """
+        Searches for the solutions recursively, starting from the current node of the search tree.
+        :param only_untill_first_solution: Should the search stop at the first solution. In that case, the board is
+         left at the solution.
+        :return: True if the search was stopped at a solution, False otherwise.
+        """
+        mark = len(self.board.trail)
+        is_solution, chosen_field, components = self.visit(only_untill_first_solution)
+        found = is_solution and only_untill_first_solution
+        for (dist, comp) in components:
+            self.assign(chosen_field, comp)
+
+            self.number_of_steps += 1
+
+            self.depth += 1
+            solved = self.solve(only_untill_first_solution)
+            self.depth -= 1
+            if solved:
+                return True
+
+            self.unassign()
+            self.stats.backtracks += 1
+            if self.on_backtrack is not None:
+                self.on_backtrack(self, chosen_field, comp)
+        if not found:
+            # revert the deductions of this node
+            self.undo(mark)
+        return found
+
+    def solve_iterative(self, only_untill_first_solution, checkpoint=None, checkpoint_interval=5.0):
+        """
+        Does the same as solve, but keeps the path from the current node of the search tree in an explicit stack
+        of frames [field, components, the number of tried components, length of the trail before the node], instead of
+        recursing. Thus, the depth of the search is not limited by the recursion limit.
+        :param only_untill_first_solution: see solve
+        :param checkpoint: None or the path of the file that the state of the search is periodically saved to, so
+         that the search can be resumed (see checkpoint.resume). The file is removed when the search is finished.
+        :param checkpoint_interval: the time between two checkpoints (in seconds)
+        :return: see solve
+        """
+        return self.search(None, only_untill_first_solution, checkpoint, checkpoint_interval)
+
+    def search(self, stack, only_untill_first_solution, checkpoint=None, checkpoint_interval=5.0):
+        """
+        Continues the search of solve_iterative from the given stack.
+        :param stack: None (the search starts at the current node) or the stack of frames (see solve_iterative);
+         the components of the frames under the top one whose subtrees are being explored are assigned on the board
+        :param only_untill_first_solution: see solve
+        :param checkpoint: see solve_iterative
+        :param checkpoint_interval: see solve_iterative
+        :return: see solve
+        """
+        start_depth = self.depth if stack is None else self.depth - len(stack) + 1
+        for _ in self.walk(stack, only_untill_first_solution, checkpoint, checkpoint_interval):
+            if only_untill_first_solution:
+                self.depth = start_depth
+                return True
+        return False
+
+    def walk(self, stack, only_untill_first_solution, checkpoint=None, checkpoint_interval=5.0):
+        """
+        The search of solve_iterative, as a generator that stops at every solution (and leaves it on the board
+        until it is resumed). When it is exhausted, the board is as it was at the start of the search.
+        :param stack: see search
+        :param only_untill_first_solution: see solve
+        :param checkpoint: see solve_iterative
+        :param checkpoint_interval: see solve_iterative
+        :return: Generator of None, one for every solution.
+        """
+        board = self.board
+        if stack is None:
+            start_depth = self.depth
+            mark = len(board.trail)
+            is_solution, chosen_field, components = self.visit(only_untill_first_solution)
+            if is_solution:
+                yield
+            stack = [[chosen_field, components, 0, mark]]
         else:
-            possibilities = []
-            chosen_field, components = None, None
-            for field in self.unknown:
-                possibilities.append((field, self.feasible_components(field.x, field.y, offset)))
-                if len(possibilities[-1][1]) <= 1:  # one or zero possibilities
-                    (chosen_field, components) = possibilities[-1]
+            start_depth = self.depth - len(stack) + 1
+        if checkpoint is not None:
+            from checkpoint import save_checkpoint
+            if self.heuristic.name not in HEURISTICS:
+                raise ValueError("The search with the heuristic {} cannot be checkpointed.".format(self.heuristic.name))
+            next_checkpoint = time.perf_counter() + checkpoint_interval
+        while stack:
+            if checkpoint is not None and time.perf_counter() >= next_checkpoint:
+                save_checkpoint(self, stack, only_untill_first_solution, checkpoint)
+                next_checkpoint = time.perf_counter() + checkpoint_interval
+            frame = stack[-1]
+            field, components, tried, mark = frame
+            if tried > 0:
+                # back from the subtree of the previous component
+                self.unassign()
+                self.stats.backtracks += 1
+                if self.on_backtrack is not None:
+                    self.on_backtrack(self, field, components[tried - 1][1])
+            if tried == len(components):
+                # revert the deductions of this node
+                self.undo(mark)
+                stack.pop()
+                continue
+            frame[2] += 1
+            self.assign(field, components[tried][1])
+            self.number_of_steps += 1
+            self.depth = start_depth + len(stack)
+            mark = len(board.trail)
+            is_solution, chosen_field, child_components = self.visit(only_untill_first_solution)
+            stack.append([chosen_field, child_components, 0, mark])
+            if is_solution:
+                yield
+        self.depth = start_depth
+        if checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+    def iter_solutions(self):
+        """
+        Finds the solutions lazily: the next solution is searched for only when it is requested.
+        When the iteration is finished (or the generator is closed), the board is as it was before it.
+        :return: Generator of the solutions (see Board.grid).
+        """
+        mark = len(self.board.trail)
+        depth = self.depth
+        try:
+            for _ in self.walk(None, True):
+                yield self.board.grid()
+        finally:
+            self.undo(mark)
+            self.depth = depth
+
+    def count_solutions(self, limit=None):
+        """
+        Counts the solutions, but stops after limit solutions. For example, limit=2 checks whether the solution is
+        unique. The board is not changed.
+        :param limit: None (all the solutions are counted) or the maximal number of the counted solutions
+        :return: The number of the found solutions (at most limit).
+        :raises ValueError: if limit is smaller than 1
+        """
+        if limit is not None and limit < 1:
+            raise ValueError("limit should be at least 1, not {}".format(limit))
+        if limit is None:
+            number_before = self.number_feasible_solutions
+            self.solve_iterative(only_untill_first_solution=False)
+            return self.number_feasible_solutions - number_before
+        number = 0
+        solutions = self.iter_solutions()
+        for _ in solutions:
+            number += 1
+            if number >= limit:
+                break
+        solutions.close()
+        return number
+
+    def is_unique(self):
+        """
+        :return: True if the nurikabe has exactly one solution, False otherwise.
+        """
+        return self.count_solutions(limit=2) == 1
+
+    def solve_with_budget(self, limit=None, max_nodes=None, time_limit=None, cancel=None):
+        """
+        Searches for the solutions, but stops when the budget (see Budget) is exceeded, or after limit solutions.
+        The board is not changed. If collect_solutions is set, the found solutions are appended to solutions.
+        :param limit: None (all the solutions are searched for) or the maximal number of the found solutions
+        :param max_nodes: see Budget
+        :param time_limit: see Budget
+        :param cancel: see Budget
+        :return: A dictionary with the keys
+         - status: 'unique', 'solved' or 'no solution' if the search was finished (or stopped after limit solutions,
+           which is reported as 'solved'), otherwise the reason for stopping (NODE_BUDGET, DEADLINE or CANCELLED),
+         - solutions: the number of the solutions found so far,
+         - nodes: the number of the visited nodes,
+         - wall_time,
+         - unknown and best_board: the number of the unknown fields of the most determined board that the search
+           has reached, and this board (see Board.grid).
+        :raises ValueError: if limit is smaller than 1
+        """
+        if limit is not None and limit < 1:
+            raise ValueError("limit should be at least 1, not {}".format(limit))
+        start = time.perf_counter()
+        mark = len(self.board.trail)
+        depth = self.depth
+        number_before = self.number_feasible_solutions
+        self.budget = Budget(max_nodes, time_limit, cancel)
+        status = None
+        # the solutions are counted one by one only if there is a limit
+        solutions = self.walk(None, limit is not None)
+        try:
+            for _ in solutions:
+                if limit is not None and self.number_feasible_solutions - number_before >= limit:
+                    status = "solved"
                     break
-            if DEBUG > 5:
-                for x in possibilities:
-                    print(offset, x)
-            if chosen_field is None:
-                (chosen_field, components) = min(possibilities, key=lambda t: (len(t[1]), t[1][0]) if len(t[1]) > 0 else (0, -float("inf")))
-            assert chosen_field.has_no_island()
-            if DEBUG:
-                print(offset, chosen_field, components)
-                if not components:
-                    print(offset, "No options!", chosen_field, components)
-                if len(components) > 1:
-                    print(offset, "Must guess ...")
-            for (dist, comp) in components:
-                island = self.components[comp]
-
-                self.unknown.remove(chosen_field)
-                chosen_field.island = island
-                island.fields.add(chosen_field)
-                
-                self.number_of_steps += 1
-                
-                if self.solve(offset + "  "):
-                    return True
-
-                self.unknown.add(chosen_field)
-                chosen_field.island = None
-                island.fields.remove(chosen_field)
-
-            return False
-
-    def get_number_of_solutions(self):
-        self.solve(only_untill_first_solution=False)
-        print("Number of solutions:", self.number_feasible_solutions)
+        except BudgetExceeded as stop:
+            status = stop.reason
+        finally:
+            solutions.close()
+            budget, self.budget = self.budget, None
+            self.undo(mark)
+            self.depth = depth
+        number = self.number_feasible_solutions - number_before
+        if status is None:
+            status = "unique" if number == 1 else "solved" if number > 1 else "no solution"
+        return {"status": status,
+                "solutions": number,
+                "nodes": budget.nodes,
+                "wall_time": time.perf_counter() - start,
+                "unknown": budget.best_unknown,
+                "best_board": budget.best_board}
+
+    def get_number_of_solutions(self, processes=1, checkpoint=None, **parallel_options):
+        """
+        Counts (and, if collect_solutions is set, collects) all the solutions of the Nurikabe.
+        :param processes: the number of processes; if greater than 1, see parallel.solve_parallel (the heuristic is
+         used by all the processes, the callbacks only up to its frontier)
+        :param checkpoint: None or the path of the checkpoint file of the search (see solve_iterative), used only
+         if processes is 1
+        :param parallel_options: further options for parallel.solve_parallel
+        :return: The number of solutions.
+        """
+        if processes > 1:
+            from parallel import solve_parallel
+            solve_parallel(self, processes, **parallel_options)
+        else:
+            self.solve_iterative(only_untill_first_solution=False, checkpoint=checkpoint)
+        if self.verbose:
+            print("Number of solutions:", self.number_feasible_solutions)
+        return self.number_feasible_solutions
@@ -0,0 +1,124 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from nurikabe import *
+
+_worker_nurikabe = None  # the Nurikabe of the worker process, see _start_worker
+
+
+def explore(nurikabe, max_depth, max_steps, pending):
+    """
+    Searches the subtree of the current node of the search tree (as Nurikabe.solve does, through Nurikabe.visit, so
+    the solutions, statistics and steps are recorded in the Nurikabe object), but does not enter the nodes that are
+    deeper than max_depth or are reached after max_steps steps. Such nodes are described by their depth and the
+    assignments that lead to them (see Board.assignments) and appended to pending.
+    :param nurikabe: A Nurikabe object.
+    :param max_depth: the maximal depth of the explored nodes
+    :param max_steps: the maximal number of steps (assignments in branching), a list [steps] so that it can be shared
+     by all the levels of the recursion
+    :param pending: A list that the unexplored nodes (pairs (depth, assignments)) are appended to.
+    :return: None
+    """
+    if nurikabe.depth >= max_depth or max_steps[0] <= 0:
+        pending.append((nurikabe.depth, nurikabe.board.assignments()))
+        return
+    mark = len(nurikabe.board.trail)
+    _, field, components = nurikabe.visit(False)
+    for (_, component) in components:
+        nurikabe.assign(field, component)
+        nurikabe.number_of_steps += 1
+        max_steps[0] -= 1
+        nurikabe.depth += 1
+        explore(nurikabe, max_depth, max_steps, pending)
+        nurikabe.depth -= 1
+        nurikabe.unassign()
+        nurikabe.stats.backtracks += 1
+        if nurikabe.on_backtrack is not None:
+            nurikabe.on_backtrack(nurikabe, field, component)
+    nurikabe.undo(mark)
+
+
+def _start_worker(width, height, islands_stems, collect_solutions, heuristic):
+    global _worker_nurikabe
+    _worker_nurikabe = Nurikabe(width, height, islands_stems, None, verbose=False,
+                                collect_solutions=collect_solutions)
+    _worker_nurikabe.heuristic = heuristic
+
+
+def _solve_subtree(depth, assignments, max_steps):
+    """
+    Explores the subtree of the node that the assignments lead to, in a worker process.
+    :param depth: the depth of the node
+    :param assignments: list [(index, component), ...]
+    :param max_steps: the maximal number of steps, after which the rest of the subtree is returned unexplored
+    :return: (the number of solutions, solutions (empty, if they are not collected), list of unexplored nodes,
+     the number of steps, statistics (see Stats.as_dict))
+    """
+    nurikabe = _worker_nurikabe
+    nurikabe.number_feasible_solutions = nurikabe.number_of_steps = 0
+    nurikabe.solutions = []
+    nurikabe.stats = Stats()
+    nurikabe.depth = depth
+    mark = len(nurikabe.board.trail)
+    for (index, component) in assignments:
+        nurikabe.assign(index, component)
+    pending = []
+    explore(nurikabe, float("inf"), [max_steps], pending)
+    nurikabe.undo(mark)
+    return (nurikabe.number_feasible_solutions, nurikabe.solutions, pending, nurikabe.number_of_steps,
+            nurikabe.stats.as_dict())
+
+
+def solve_parallel(nurikabe, processes=None, frontier_depth=6, max_steps=20000):
+    """
+    Searches for all the solutions of the Nurikabe object with a pool of processes. The search tree is expanded up
+    to the depth frontier_depth, and the subtrees of the frontier nodes are solved independently. A subtree that is
+    not finished after max_steps steps is split again: its unexplored nodes are sent back to the pool, so that the
+    idle processes can take them over.
+
+    The workers use the heuristic of the Nurikabe object, and their numbers of solutions, solutions (if
+    collect_solutions is set), steps and statistics are added to it. The callbacks (on_node, on_solution,
+    on_backtrack) and the budget are used only for the nodes up to the frontier, which are searched in the calling
+    process.
+    :param nurikabe: A Nurikabe object.
+    :param processes: the number of processes (by default, the number of processors)
+    :param frontier_depth: the depth of the initial split of the search tree
+    :param max_steps: the number of steps that a process makes in a subtree before splitting it
+    :return: The number of the found solutions.
+    """
+    number_before = nurikabe.number_feasible_solutions
+    pending = []
+    depth = nurikabe.depth
+    explore(nurikabe, depth + frontier_depth, [float("inf")], pending)
+    initargs = (nurikabe.width, nurikabe.height, nurikabe.islands_stems, nurikabe.collect_solutions,
+                nurikabe.heuristic)
+    with ProcessPoolExecutor(processes, initializer=_start_worker, initargs=initargs) as pool:
+        running = set()
+        while pending or running:
+            while pending:
+                running.add(pool.submit(_solve_subtree, *pending.pop(), max_steps))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                number, solutions, subtree_pending, steps, stats = future.result()
+                nurikabe.number_feasible_solutions += number
+                nurikabe.solutions += solutions
+                nurikabe.number_of_steps += steps
+                nurikabe.stats.add(stats)
+                pending += subtree_pending
+    return nurikabe.number_feasible_solutions - number_before
+
+
+def count_solutions(width, height, islands_stems, processes=None, frontier_depth=6, max_steps=20000,
+                    collect_solutions=False):
+    """
+    Counts the solutions of the Nurikabe with a pool of processes, see solve_parallel.
+    :param width: The width of the Nurikabe.
+    :param height: The height of the Nurikabe.
+    :param islands_stems: List of triples (x, y, size), see Nurikabe.
+    :param processes: see solve_parallel
+    :param frontier_depth: see solve_parallel
+    :param max_steps: see solve_parallel
+    :param collect_solutions: Should the solutions (see Board.grid) be collected.
+    :return: (the number of solutions, list of solutions (empty, if they are not collected))
+    """
+    nurikabe = Nurikabe(width, height, islands_stems, None, verbose=False, collect_solutions=collect_solutions)
+    number = solve_parallel(nurikabe, processes, frontier_depth, max_steps)
+    return number, nurikabe.solutions
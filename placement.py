@@ -0,0 +1,240 @@
+import argparse
+import time
+from nurikabe import *
+from saveAndLoad import *
+
+
+class TooManyPlacements(Exception):
+    pass
+
+
+def enumerate_placements(board, component, allowed, max_placements=None):
+    """
+    Enumerates the placements of the island: the connected sets of fields of its final size, that contain its fields
+    and lie within allowed. Every set is found once (Redelmeier's algorithm, started from the part of the island that
+    contains the stem): a field that was offered and rejected is never offered again in the same branch.
+    :param board: A Board object.
+    :param component: component of a proper island
+    :param allowed: mask of the fields that the island may contain
+    :param max_placements: None or the maximal number of the placements
+    :return: List of masks.
+    :raises TooManyPlacements: if there are more than max_placements placements
+    """
+    size = board.final_sizes[component]
+    required = board.island_masks[component]
+    stem = board.flood(required & -required, required)
+    placements = []
+
+    def extend(placement, untried, seen, missing):
+        while untried:
+            bit = untried & -untried
+            untried ^= bit
+            if missing == 1:
+                if (placement | bit) & required == required:
+                    placements.append(placement | bit)
+                    if max_placements is not None and len(placements) > max_placements:
+                        raise TooManyPlacements()
+                continue
+            neighbours = board.expand(bit) & allowed & ~seen
+            extend(placement | bit, untried | neighbours, seen | neighbours, missing - 1)
+
+    if stem.bit_count() == size:
+        if stem == required:
+            placements.append(stem)
+    else:
+        untried = board.expand(stem) & allowed & ~stem
+        extend(stem, untried, stem | untried, size - stem.bit_count())
+    return placements
+
+
+class PlacementSearch:
+    def __init__(self, width, height, islands_stems, max_placements=100000):
+        """
+        Constructor for this class. An alternative to the search of Nurikabe, which assigns one field at a time:
+        the placements of every island are enumerated in advance (see enumerate_placements), within the reach of the
+        island after the deductions of Nurikabe.propagate, and the search assigns a whole placement at a time.
+
+        At every node, the deductions of Nurikabe.propagate are applied to the board, and the placements of the
+        remaining islands are filtered by it (see _propagate). The next island is the one with the fewest placements
+        per failure: the islands whose placements often fail are tried early, so that the failures are found
+        before the other choices are made.
+        :param width: see Nurikabe
+        :param height: see Nurikabe
+        :param islands_stems: see Nurikabe
+        :param max_placements: the maximal number of the placements of one island
+        :return: A PlacementSearch object.
+        :raises TooManyPlacements: if an island has more than max_placements placements
+        """
+        self.nurikabe = Nurikabe(width, height, islands_stems, None, verbose=False)
+        self.board = board = self.nurikabe.board
+        self.number_of_steps = 0
+        self.failures = {}  # {component: the number of the failed placements of the island}
+        self.consistent = self.nurikabe.propagate()
+        self.placements = {}  # {component: [mask, ...]}
+        if not self.consistent:
+            return
+        contacts = board.island_contacts(board.unknown_mask)
+        for component in range(1, board.number_of_islands + 1):
+            allowed = board.island_masks[component]
+            if board.possible_expansion(component) > 0:
+                allowed |= board.reach_mask(component) & ~board.touching_others(contacts, component)
+            self.placements[component] = enumerate_placements(board, component, allowed, max_placements)
+
+    def iter_solutions(self):
+        """
+        :return: Generator of the solutions (see Board.grid).
+        """
+        if not self.consistent:
+            return
+        mark = len(self.board.trail)
+        try:
+            yield from self._search(dict(self.placements))
+        finally:
+            self.nurikabe.undo(mark)
+
+    def _search(self, remaining, last=None):
+        """
+        :param remaining: {component: [placements]} of the islands without placement
+        :param last: None or the component of the island that was placed last
+        :return: Generator of the solutions (see Board.grid).
+        """
+        self.number_of_steps += 1
+        nurikabe, board = self.nurikabe, self.board
+        mark = len(board.trail)
+        remaining = self._propagate(remaining)
+        if remaining is None:
+            if last is not None:
+                self.failures[last] = self.failures.get(last, 0) + 1
+        elif not remaining:
+            if not board.unknown_mask and nurikabe.is_feasible():
+                yield board.grid()
+        else:
+            # the fewest placements per failure
+            component = min(remaining, key=lambda c: (len(remaining[c]) / (1 + self.failures.get(c, 0)), c))
+            others = {c: placements for (c, placements) in remaining.items() if c != component}
+            for placement in remaining[component]:
+                inner_mark = len(board.trail)
+                if self._place(component, placement):
+                    yield from self._search(others, component)
+                else:
+                    self.failures[component] = self.failures.get(component, 0) + 1
+                nurikabe.undo(inner_mark)
+        nurikabe.undo(mark)
+
+    def _place(self, component, placement):
+        """
+        Assigns the unknown fields to the island, starting with the ones next to it.
+        :param component: component of the island
+        :param placement: mask of the fields (e.g., a placement of the island)
+        :return: True if this is possible, False otherwise.
+        """
+        board = self.board
+        todo = placement & board.unknown_mask
+        while todo:
+            frontier = board.expand(board.island_masks[component]) & todo or todo
+            for field in iterate_bits(frontier):
+                if not self.nurikabe.force(field, component):
+                    return False
+            todo &= ~frontier
+        return True
+
+    def _propagate(self, remaining):
+        """
+        Applies Nurikabe.propagate to the board, and filters the placements of the remaining islands by it: a
+        placement must contain the fields of its island, and must not contain sea or touch another island. Then,
+        the following deductions are applied, and everything is repeated until none of them applies anymore:
+        1. The fields that are part of every placement of an island belong to it.
+        2. The unknown fields that no placement covers are sea.
+        3. If only one island can still cover a field of a 2 x 2 area, it must do that.
+        :param remaining: see _search
+        :return: The filtered remaining, or None if the board or some island has no solution.
+        """
+        nurikabe, board = self.nurikabe, self.board
+        width, corners = board.width, board.square_corners
+        changed = True
+        while changed:
+            changed = False
+            if not nurikabe.propagate():
+                return None
+            islands = board.full_mask ^ board.sea_mask ^ board.unknown_mask
+            filtered = {}
+            possible = islands
+            square_hits = {}
+            hit_once = hit_twice = 0
+            for component, placements in remaining.items():
+                required = board.island_masks[component]
+                forbidden = board.sea_mask | board.expand(islands ^ required)
+                placements = [p for p in placements if p & required == required and not p & forbidden]
+                if not placements:
+                    return None
+                filtered[component] = placements
+                union, intersection = 0, board.full_mask
+                for placement in placements:
+                    union |= placement
+                    intersection &= placement
+                possible |= union
+                hits = (union | (union >> 1) | (union >> width) | (union >> (width + 1))) & corners
+                square_hits[component] = hits
+                hit_twice |= hit_once & hits
+                hit_once |= hits
+                # 1.
+                if intersection & board.unknown_mask:
+                    if not self._place(component, intersection):
+                        return None
+                    changed = True
+            remaining = filtered
+            if changed:
+                continue
+            # 2.
+            for field in iterate_bits(board.unknown_mask & ~possible):
+                if not nurikabe.force(field, SEA):
+                    return None
+                changed = True
+            if changed:
+                continue
+            # 3.
+            satisfied = (islands | (islands >> 1) | (islands >> width) | (islands >> (width + 1))) & corners
+            for corner in iterate_bits(hit_once & ~hit_twice & ~satisfied):
+                square = (1 << corner) | (1 << (corner + 1)) | (1 << (corner + width)) | (1 << (corner + width + 1))
+                component = next(c for (c, hits) in square_hits.items() if hits >> corner & 1)
+                placements = [p for p in remaining[component] if p & square]
+                if len(placements) < len(remaining[component]):
+                    if not placements:
+                        return None
+                    remaining = dict(remaining)
+                    remaining[component] = placements
+                    changed = True
+        return remaining
+
+    def count_solutions(self, limit=None):
+        """
+        :param limit: see Nurikabe.count_solutions
+        :return: The number of the solutions (at most limit).
+        :raises ValueError: if limit is smaller than 1
+        """
+        if limit is not None and limit < 1:
+            raise ValueError("limit should be at least 1, not {}".format(limit))
+        number = 0
+        solutions = self.iter_solutions()
+        for _ in solutions:
+            number += 1
+            if limit is not None and number >= limit:
+                break
+        solutions.close()
+        return number
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Counts the solutions of the nurikabe 'nurikabe<ind>.txt' by choosing "
+                                                 "the placements of whole islands.")
+    parser.add_argument("ind", type=int, help="index of the nurikabe")
+    parser.add_argument("-d", "--directory", default="", help="the directory of the nurikabe")
+    parser.add_argument("--max-placements", type=int, default=100000,
+                        help="the maximal number of the placements of one island")
+    arguments = parser.parse_args()
+    start = time.perf_counter()
+    search = PlacementSearch(*load_nurikabe(arguments.ind, arguments.directory), arguments.max_placements)
+    number = search.count_solutions()
+    print("solutions:", number, "steps:", search.number_of_steps, "placements:",
+          sum(len(placements) for placements in search.placements.values()),
+          "time: {:.2f} s".format(time.perf_counter() - start))
@@ -0,0 +1,114 @@
+import argparse
+import time
+from multiprocessing import Process, Queue
+from queue import Empty
+from nurikabe import *
+from saveAndLoad import *
+
+
+def default_configurations():
+    """
+    The configurations of the portfolio: every heuristic of HEURISTICS, random tie-breaking with different seeds, and
+    random tie-breaking with restarts.
+    :return: List of triples (name, heuristic, restart_nodes), see run_configuration.
+    """
+    configurations = [(name, heuristic, None) for (name, heuristic) in HEURISTICS.items()]
+    configurations += [("random-{}".format(seed), RandomHeuristic(seed), None) for seed in (1, 2)]
+    configurations.append(("random-restarts", RandomHeuristic(3), 100))
+    return configurations
+
+
+def run_configuration(width, height, stems, limit, heuristic, restart_nodes=None):
+    """
+    Solves the nurikabe with the given configuration.
+    :param width: The width of the nurikabe.
+    :param height: The height of the nurikabe.
+    :param stems: List of triples (x, y, size).
+    :param limit: see Nurikabe.solve_with_budget (1 finds a solution, 2 also proves that it is unique)
+    :param heuristic: A Heuristic object.
+    :param restart_nodes: None (no restarts) or the node budget of the first run: when a run exceeds its budget, the
+     search starts again with the next seed of the random heuristic (see RandomHeuristic) and twice the budget
+    :return: The result of Nurikabe.solve_with_budget, with the solutions (see Board.grid) under the key grids,
+     and the number of the restarts.
+    """
+    nurikabe = Nurikabe(width, height, stems, None, verbose=False, collect_solutions=True)
+    nurikabe.heuristic = heuristic
+    restarts = 0
+    while True:
+        nurikabe.solutions = []
+        result = nurikabe.solve_with_budget(limit, restart_nodes)
+        if result["status"] != NODE_BUDGET:
+            break
+        restarts += 1
+        restart_nodes *= 2
+        nurikabe.heuristic = RandomHeuristic(getattr(heuristic, "seed", 0) + restarts)
+    result["grids"] = nurikabe.solutions
+    result["restarts"] = restarts
+    return result
+
+
+def _run(width, height, stems, limit, configuration, results):
+    name, heuristic, restart_nodes = configuration
+    results.put((name, run_configuration(width, height, stems, limit, heuristic, restart_nodes)))
+
+
+def solve_portfolio(width, height, stems, unique=True, configurations=None, processes=None, timeout=None):
+    """
+    Races several configurations (see default_configurations) in parallel processes on the same nurikabe, and returns
+    the result of the first one that finishes. The others are terminated.
+    :param width: The width of the nurikabe.
+    :param height: The height of the nurikabe.
+    :param stems: List of triples (x, y, size).
+    :param unique: Should the uniqueness of the solution be proved too (otherwise, the first solution is enough).
+    :param configurations: List of triples (name, heuristic, restart_nodes), by default default_configurations().
+    :param processes: the number of processes, i.e., of the configurations that are used (by default, all of them,
+     even if there are fewer processors: a configuration that needs few nodes still wins the race)
+    :param timeout: None or the maximal wall time (in seconds)
+    :return: The result of the winning configuration (see run_configuration), with its name under the key
+     configuration, or a dictionary with the status DEADLINE or 'error', if no configuration finished.
+    """
+    start = time.perf_counter()
+    configurations = (configurations or default_configurations())[:processes]
+    results = Queue()
+    running = []
+    for configuration in configurations:
+        process = Process(target=_run, args=(width, height, stems, 2 if unique else 1, configuration, results),
+                          daemon=True)
+        process.start()
+        running.append(process)
+    try:
+        while any(process.is_alive() for process in running) or not results.empty():
+            if timeout is not None and time.perf_counter() - start > timeout:
+                return {"status": DEADLINE, "wall_time": time.perf_counter() - start}
+            try:
+                name, result = results.get(timeout=0.05)
+            except Empty:
+                continue
+            result["configuration"] = name
+            result["wall_time"] = time.perf_counter() - start
+            return result
+        return {"status": "error", "error": "all the configurations failed", "wall_time": time.perf_counter() - start}
+    finally:
+        for process in running:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solves the nurikabe 'nurikabe<ind>.txt' with a portfolio of "
+                                                 "differently configured searches.")
+    parser.add_argument("ind", type=int, help="index of the nurikabe")
+    parser.add_argument("-d", "--directory", default="", help="the directory of the nurikabe")
+    parser.add_argument("-p", "--processes", type=int, default=None, help="the number of processes")
+    parser.add_argument("-t", "--timeout", type=float, default=None, help="time limit (in seconds)")
+    parser.add_argument("--first", action="store_true", help="stop at the first solution, do not prove uniqueness")
+    arguments = parser.parse_args()
+    width, height, stems = load_nurikabe(arguments.ind, arguments.directory)
+    result = solve_portfolio(width, height, stems, not arguments.first, processes=arguments.processes,
+                             timeout=arguments.timeout)
+    for grid in result.pop("grids", []):
+        for line in grid:
+            print(" ".join("{:>3}".format(component) for component in line))
+        print()
+    result.pop("best_board", None)
+    print(result)
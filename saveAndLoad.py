@@ -1,4 +1,13 @@
-from os.path import exists
+import re
+from os.path import exists, join
+from board import check_stems
+
+STEM = re.compile(r"\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)")
+LINE = re.compile(r"\[([^\[\]]*)\]")
+# a whole list of the elements, e.g. [(1, 2, 3), (4, 5, 6)]
+STEMS = re.compile(r"\[\s*(?:{0}(?:\s*,\s*{0})*)?\s*\]".format(STEM.pattern))
+LINES = re.compile(r"\[\s*(?:{0}(?:\s*,\s*{0})*)?\s*\]".format(LINE.pattern))
+KEYS = ("width", "height", "stems")
 
 
 def write_nurikabe(ind):
@@ -25,25 +34,64 @@ def write_nurikabe(ind):
                 stems.append((x, y, size))
             except ValueError:
                 print("Something went frong, the last description has no effect.")
-    with open("nurikabe{}.txt".format(ind), "w") as f:
+    save_nurikabe(width, height, stems, ind)
+    return width, height, stems
+
+
+def save_nurikabe(width, height, stems, ind, directory=""):
+    """
+    Saves the description of the nurikabe to the file 'nurikabe<ind>.txt'.
+    :param width: width of the nurikabe
+    :param height: height of the nurikabe
+    :param stems: island stems, a list of form [(stem_x, stem_y, island size), ...]
+    :param ind: index of the nurikabe
+    :param directory: the directory of the file (by default, the current directory)
+    :return: None
+    """
+    with open(join(directory, "nurikabe{}.txt".format(ind)), "w") as f:
         print("width;" + str(width), file=f)
         print("height;" + str(height), file=f)
         print("stems;" + str(stems), file=f)
 
-    return width, height, stems
-
 
-def load_nurikabe(ind):
+def load_nurikabe(ind, directory=""):
     """
     Loads nurikabe from the file 'nurikabe<ind>.txt'.
     :param ind: index of the nurikabe
+    :param directory: the directory of the file (by default, the current directory)
     :return: Description of the nurikabe.
     """
-    nuri = []
-    with open("nurikabe{}.txt".format(ind)) as f:
-        for x in f:
-            nuri.append(eval(x[x.find(";") + 1:].strip()))
-    return nuri
+    with open(join(directory, "nurikabe{}.txt".format(ind))) as f:
+        return parse_nurikabe(f.read())
+
+
+def parse_nurikabe(text):
+    """
+    Parses the description of a nurikabe, i.e., the lines 'width;<width>', 'height;<height>' and
+    'stems;[(x, y, size), ...]'.
+    :param text: the content of the file 'nurikabe<ind>.txt'
+    :return: [width, height, island stems], where island stems is a list of form [(stem_x, stem_y, island size), ...].
+    :raises ValueError: if the description is malformed, or a stem is invalid (see board.check_stems)
+    """
+    values = {}
+    for line in text.splitlines():
+        if line.strip():
+            key, _, value = line.partition(";")
+            key = key.strip()
+            if key not in KEYS or key in values:
+                raise ValueError("Unknown or repeated line in the description of the nurikabe: {}".format(line))
+            values[key] = value.strip()
+    try:
+        width = int(values["width"])
+        height = int(values["height"])
+        stems = values["stems"]
+    except (KeyError, ValueError):
+        raise ValueError("The description of the nurikabe needs the integers width and height, and stems.")
+    if not STEMS.fullmatch(stems):
+        raise ValueError("The stems should be a list of triples (x, y, size): {}".format(stems))
+    stems = [tuple(int(t) for t in stem) for stem in STEM.findall(stems)]
+    check_stems(width, height, stems)
+    return [width, height, stems]
 
 
 def write_solution(width, height, ind):
@@ -76,17 +124,56 @@ def write_solution(width, height, ind):
     else:
         ali = True
     if ali:
-        with open(out, "w") as f:
-            print(a, file=f)
+        save_solution(a, ind)
     return a
 
 
-def load_solution(ind):
+def save_solution(solution, ind, directory=""):
+    """
+    Saves the solution to the file 'nurikabe<ind>solution.txt'.
+    :param solution: solution of the nurikabe (see load_solution)
+    :param ind: index of the nurikabe
+    :param directory: the directory of the file (by default, the current directory)
+    :return: None
+    """
+    with open(join(directory, "nurikabe{}solution.txt".format(ind)), "w") as f:
+        print(solution, file=f)
+
+
+def load_solution(ind, directory=""):
     """
     Loads solution for nurikabe with given index.
     :param ind: index of the nurikabe
+    :param directory: the directory of the file (by default, the current directory)
     :return: solution of the nurikabe
     """
-    solution = "nurikabe{}solution.txt".format(ind)
+    solution = join(directory, "nurikabe{}solution.txt".format(ind))
     with open(solution) as f:
-        return eval(f.readline())
+        return parse_solution(f.readline())
+
+
+def parse_solution(text):
+    """
+    Parses the pencil-paper solution, i.e., a list of lines, where each line is a list of SEA, island sizes
+    and '' (unknown), or a logic value (True or False).
+    :param text: the content of the file 'nurikabe<ind>solution.txt'
+    :return: solution of the nurikabe
+    """
+    text = text.strip()
+    if text in ("True", "False"):
+        return text == "True"
+    if not LINES.fullmatch(text):
+        raise ValueError("The solution should be a list of lists: {}".format(text[:50]))
+    solution = []
+    for line in LINE.findall(text[1:-1]):
+        values = []
+        for value in line.split(","):
+            value = value.strip()
+            if value in ("''", '""'):
+                values.append("")
+            elif re.fullmatch(r"-?\d+", value):
+                values.append(int(value))
+            else:
+                raise ValueError("Unknown value in the solution: {}".format(value))
+        solution.append(values)
+    return solution
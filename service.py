@@ -0,0 +1,385 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from nurikabe import *
+
+# the 8 symmetries of the board: (x, y, width, height) -> (x, y) on the transformed board, and whether the width and
+# the height are swapped
+SYMMETRIES = ((lambda x, y, w, h: (x, y), False),
+              (lambda x, y, w, h: (w - 1 - x, y), False),
+              (lambda x, y, w, h: (x, h - 1 - y), False),
+              (lambda x, y, w, h: (w - 1 - x, h - 1 - y), False),
+              (lambda x, y, w, h: (y, x), True),
+              (lambda x, y, w, h: (h - 1 - y, x), True),
+              (lambda x, y, w, h: (y, w - 1 - x), True),
+              (lambda x, y, w, h: (h - 1 - y, w - 1 - x), True))
+
+
+def canonical_form(width, height, stems):
+    """
+    Finds the canonical form of the nurikabe: the smallest of its 8 rotations and reflections (with the stems
+    transformed accordingly and sorted), so that the symmetric nurikabes have the same canonical form.
+    :param width: The width of the nurikabe.
+    :param height: The height of the nurikabe.
+    :param stems: List of triples (x, y, size).
+    :return: (canonical hash, index of the symmetry in SYMMETRIES, (width, height, stems) of the canonical form)
+    """
+    forms = []
+    for symmetry, (transform, swapped) in enumerate(SYMMETRIES):
+        new_stems = sorted(transform(x, y, width, height) + (size,) for (x, y, size) in stems)
+        forms.append(((height, width) if swapped else (width, height)) + (new_stems, symmetry))
+    new_width, new_height, new_stems, symmetry = min(forms)
+    key = hashlib.sha256(json.dumps([new_width, new_height, new_stems]).encode()).hexdigest()
+    return key, symmetry, (new_width, new_height, new_stems)
+
+
+def from_canonical(grid, width, height, symmetry):
+    """
+    Transforms a grid of the canonical form back to the orientation of the nurikabe.
+    :param grid: list of lists (rows) of the canonical form
+    :param width: The width of the nurikabe.
+    :param height: The height of the nurikabe.
+    :param symmetry: see canonical_form
+    :return: List of lists.
+    """
+    transform = SYMMETRIES[symmetry][0]
+    result = [[None] * width for _ in range(height)]
+    for y in range(height):
+        for x in range(width):
+            new_x, new_y = transform(x, y, width, height)
+            result[y][x] = grid[new_y][new_x]
+    return result
+
+
+def to_canonical(grid, width, height, symmetry):
+    """
+    Transforms a grid of the nurikabe to the orientation of its canonical form (the inverse of from_canonical).
+    :return: List of lists.
+    """
+    transform, swapped = SYMMETRIES[symmetry]
+    new_width, new_height = (height, width) if swapped else (width, height)
+    result = [[None] * new_width for _ in range(new_height)]
+    for y in range(height):
+        for x in range(width):
+            new_x, new_y = transform(x, y, width, height)
+            result[new_y][new_x] = grid[y][x]
+    return result
+
+
+class ResultCache:
+    def __init__(self, capacity=10000, path=None):
+        """
+        Constructor for this class. The cache stores the results of the solved nurikabes under their canonical hashes
+        (see canonical_form). When the cache is full, the least recently used entry is evicted. If path is given,
+        the entries are appended to this file as JSON lines, and the cache is filled from it at the start (and the file
+        is rewritten with the entries that were kept).
+        :param capacity: the maximal number of entries
+        :param path: None or the path of the file of the cache
+        :return: A ResultCache object.
+        """
+        self.capacity = capacity
+        self.path = path
+        self.entries = OrderedDict()  # {hash: result}, the least recently used first
+        self.hits = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        key, result = json.loads(line)
+                    except ValueError:  # a line that was not written completely
+                        continue
+                    self._put(key, result)
+            self.evictions = 0
+            temporary = path + ".tmp"
+            with open(temporary, "w") as f:
+                for key, result in self.entries.items():
+                    f.write(json.dumps([key, result], separators=(",", ":")) + "\n")
+            os.replace(temporary, path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _put(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        """
+        :param key: the canonical hash of the nurikabe
+        :return: The result, or None if it is not known.
+        """
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            return result
+
+    def store(self, key, result):
+        """
+        Stores the result (and appends it to the file of the cache), unless the stored result of the nurikabe
+        already answers everything that this one does (see satisfies).
+        :param key: the canonical hash of the nurikabe
+        :param result: see solve_canonical
+        :return: None
+        """
+        with self.lock:
+            old = self.entries.get(key)
+            if old is not None and satisfies(old, result["limit"], result["grids"] is not None):
+                return
+            self._put(key, result)
+            if self.path is not None:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps([key, result], separators=(",", ":")) + "\n")
+
+
+def satisfies(result, limit, grids):
+    """
+    Checks whether a result answers the request.
+    :param result: see solve_canonical
+    :param limit: see SolverService.submit
+    :param grids: see SolverService.submit
+    :return: True or False
+    """
+    exact = result["limit"] is None or result["solutions"] < result["limit"]
+    return (exact or (limit is not None and limit <= result["solutions"])) and (not grids or
+                                                                                result["grids"] is not None)
+
+
+def solve_canonical(width, height, stems, limit, grids, symmetry, max_nodes=None, deadline=None):
+    """
+    Solves the nurikabe in a worker process. The search is not symmetric (the same nurikabe may need a different
+    number of nodes in another orientation), so the nurikabe is solved as submitted, and the solutions are
+    transformed to the canonical form afterwards.
+    :param width: The width of the nurikabe.
+    :param height: The height of the nurikabe.
+    :param stems: List of triples (x, y, size).
+    :param limit: None or the maximal number of the counted solutions, see Nurikabe.count_solutions
+    :param grids: Should the solutions be returned.
+    :param symmetry: the symmetry of the canonical form, see canonical_form
+    :param max_nodes: see Budget
+    :param deadline: None or the time (see time.time) when the search is stopped
+    :return: A dictionary with the number of solutions, the limit, the solutions in the canonical form (lists of
+     rows, where an element is SEA or the size of the island) or None, the number of nodes, and the reason for
+     stopping the search early (see Budget) or None.
+    """
+    nurikabe = Nurikabe(width, height, [tuple(stem) for stem in stems], None, verbose=False, collect_solutions=grids)
+    result = nurikabe.solve_with_budget(limit, max_nodes, None if deadline is None else deadline - time.time())
+    sizes = None
+    if grids:
+        sizes = [to_canonical([[SEA if component == SEA else nurikabe.board.final_sizes[component]
+                                for component in line] for line in grid], width, height, symmetry)
+                 for grid in nurikabe.solutions]
+    stopped = result["status"] if result["status"] in (NODE_BUDGET, DEADLINE, CANCELLED) else None
+    return {"solutions": result["solutions"], "limit": limit, "grids": sizes, "nodes": nurikabe.number_of_steps,
+            "stopped": stopped}
+
+
+def _positive(value, kind, name):
+    """
+    Checks an optional numeric option of a request.
+    :param value: None or the value of the option
+    :param kind: int or float
+    :param name: the name of the option (for the error message)
+    :return: None or the value, converted to kind.
+    :raises ValueError: if the value is not None and not a positive number of the given kind
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float) if kind is float else int) or \
+            not 0 < value < float("inf"):
+        raise ValueError("{} should be a positive {}, not {!r}".format(name, kind.__name__, value))
+    return kind(value)
+
+
+def _warm_up(_):
+    return os.getpid()
+
+
+class SolverService:
+    def __init__(self, processes=None, capacity=10000, cache_path=None):
+        """
+        Constructor for this class. The service solves the nurikabes in a pool of worker processes, which are started
+        at once, and caches the results (see ResultCache). A nurikabe that is already being solved (possibly in
+        another orientation) is not solved again, the request waits for the running one.
+        :param processes: the number of worker processes (by default, the number of processors)
+        :param capacity: see ResultCache
+        :param cache_path: see ResultCache
+        :return: A SolverService object.
+        """
+        processes = processes or os.cpu_count()
+        self.pool = ProcessPoolExecutor(processes)
+        list(self.pool.map(_warm_up, range(processes)))
+        self.cache = ResultCache(capacity, cache_path)
+        self.running = {}  # {(hash, limit, grids, max_nodes, deadline): future of solve_canonical}
+        self.lock = threading.Lock()
+
+    def submit(self, request):
+        """
+        Submits a request: a dictionary with the keys
+        - width, height and stems (list of triples (x, y, size)) of the nurikabe,
+        - id (optional), which is copied to the response,
+        - limit (optional): count at most limit (a positive integer) solutions (e.g. 2 checks whether the solution
+          is unique),
+        - grids (optional): should the solutions be returned too,
+        - max_nodes and time_limit (optional, positive): the budget of the search (see Budget); the time limit
+          includes the time that the request waits for a free worker.
+        A request with invalid options gets a response with the status 'error'.
+        A result of a search that was stopped by its budget is not cached.
+        :param request: A dictionary.
+        :return: A Future of the response: a dictionary with the keys id, status ('unique', 'solved', 'no solution',
+         'error' or the reason for stopping the search, see Budget), solutions (at most limit), grids (if requested),
+         nodes, cached and wall_time.
+        """
+        start = time.perf_counter()
+        response = Future()
+        try:
+            width, height = int(request["width"]), int(request["height"])
+            stems = [(int(x), int(y), int(size)) for (x, y, size) in request["stems"]]
+            check_stems(width, height, stems)
+            limit, grids = _positive(request.get("limit"), int, "limit"), bool(request.get("grids", False))
+            max_nodes = _positive(request.get("max_nodes"), int, "max_nodes")
+            time_limit = _positive(request.get("time_limit"), float, "time_limit")
+            deadline = None if time_limit is None else time.time() + time_limit
+            key, symmetry, _ = canonical_form(width, height, stems)
+        except Exception as error:
+            response.set_result({"id": request.get("id") if isinstance(request, dict) else None, "status": "error",
+                                 "error": repr(error), "wall_time": time.perf_counter() - start})
+            return response
+
+        def answer(result, cached):
+            number = result["solutions"] if limit is None else min(limit, result["solutions"])
+            unique = number == 1 and (limit is None or limit > 1)
+            reply = {"id": request.get("id"),
+                     "status": result.get("stopped") or ("unique" if unique else "solved" if number > 0 else
+                                                         "no solution"),
+                     "solutions": number,
+                     "nodes": result["nodes"],
+                     "cached": cached}
+            if grids:
+                reply["grids"] = [from_canonical(grid, width, height, symmetry) for grid in result["grids"][:number]]
+            reply["wall_time"] = time.perf_counter() - start
+            response.set_result(reply)
+
+        result = self.cache.get(key)
+        if result is not None and satisfies(result, limit, grids):
+            answer(result, True)
+            return response
+        task = (key, limit, grids, max_nodes, deadline)
+        with self.lock:
+            running = self.running.get(task)
+            if running is None:
+                running = self.pool.submit(solve_canonical, width, height, stems, limit, grids, symmetry, max_nodes,
+                                           deadline)
+                self.running[task] = running
+
+        def done(future):
+            with self.lock:
+                self.running.pop(task, None)
+            try:
+                result = future.result()
+            except Exception as error:
+                response.set_result({"id": request.get("id"), "status": "error", "error": repr(error),
+                                     "wall_time": time.perf_counter() - start})
+                return
+            if result["stopped"] is None:
+                self.cache.store(key, result)
+            answer(result, False)
+
+        running.add_done_callback(done)
+        return response
+
+    def solve(self, request):
+        """
+        :param request: see submit
+        :return: The response, see submit.
+        """
+        return self.submit(request).result()
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def serve_lines(service, lines, output):
+    """
+    Reads the requests (JSON lines) and writes the responses (JSON lines) as soon as they are known, so they are not
+    necessarily in the order of the requests (see the key id of the requests).
+    :param service: A SolverService object.
+    :param lines: iterable of strings
+    :param output: file-like object
+    :return: None
+    """
+    lock = threading.Lock()
+    written = threading.Semaphore(0)
+
+    def write(future):
+        with lock:
+            output.write(json.dumps(future.result()) + "\n")
+            output.flush()
+        written.release()
+
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            response = service.submit(json.loads(line))
+        except ValueError as error:
+            response = Future()
+            response.set_result({"id": None, "status": "error", "error": repr(error)})
+        response.add_done_callback(write)
+        number += 1
+    for _ in range(number):
+        written.acquire()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        serve_lines(self.server.service, io.TextIOWrapper(self.rfile, encoding="utf-8"),
+                    io.TextIOWrapper(self.wfile, encoding="utf-8", write_through=True))
+
+
+def serve_socket(service, port, host="127.0.0.1"):
+    """
+    Serves the JSON lines (see serve_lines) on a local TCP socket, one thread per connection.
+    :param service: A SolverService object.
+    :param port: the port
+    :param host: the address
+    :return: None
+    """
+    with socketserver.ThreadingTCPServer((host, port), _Handler) as server:
+        server.daemon_threads = True
+        server.service = service
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solves the nurikabes of the JSON lines requests (from the standard "
+                                                 "input or a local socket) and caches the results.")
+    parser.add_argument("-p", "--processes", type=int, default=None, help="the number of worker processes")
+    parser.add_argument("--capacity", type=int, default=10000, help="the maximal number of cached results")
+    parser.add_argument("--cache", default=None, help="the file that the cached results are kept in")
+    parser.add_argument("--port", type=int, default=None, help="serve on this local port instead of the standard "
+                                                               "input and output")
+    arguments = parser.parse_args()
+    solver_service = SolverService(arguments.processes, arguments.capacity, arguments.cache)
+    try:
+        if arguments.port is None:
+            serve_lines(solver_service, sys.stdin, sys.stdout)
+        else:
+            serve_socket(solver_service, arguments.port)
+    finally:
+        solver_service.close()
@@ -0,0 +1,79 @@
+import json
+
+# reasons for dead ends of the search, see Stats.dead_ends
+ISOLATED_ISLAND = "isolated island"  # an island cannot be completed (too little space or cut into parts)
+SEA_CUT = "sea cut"                  # the sea cannot be connected anymore
+POOL = "2x2 pool"                    # a 2 x 2 sea area cannot be avoided
+CONFLICT = "conflict"                # a deduced assignment is not allowed
+CAPACITY = "capacity"                # the islands need more fields than they can still reach
+NO_OPTIONS = "no options"            # a field cannot be part of any component
+INFEASIBLE = "infeasible"            # the board is full, but is not a solution
+
+
+class Stats:
+    def __init__(self):
+        """
+        Constructor for this class. The statistics of a search: counters, maximal depth and time per phase.
+        :return: A Stats object.
+        """
+        self.nodes = 0         # visited nodes of the search tree
+        self.backtracks = 0    # reverted branches
+        self.forced = 0        # assignments made by the deductions (see Nurikabe.propagate)
+        self.guesses = 0       # nodes with more than one option
+        self.solutions = 0
+        self.max_depth = 0
+        self.dead_ends = {}    # {reason: number}
+        self.times = {}        # {phase: time in seconds}
+
+    def dead_end(self, reason):
+        """
+        Counts a dead end.
+        :param reason: one of the reasons above
+        :return: False, so that the callers can return the result.
+        """
+        self.dead_ends[reason] = self.dead_ends.get(reason, 0) + 1
+        return False
+
+    def add_time(self, phase, seconds):
+        self.times[phase] = self.times.get(phase, 0.0) + seconds
+
+    def as_dict(self):
+        """
+        :return: The statistics as a dictionary (of numbers and dictionaries).
+        """
+        return {"nodes": self.nodes,
+                "backtracks": self.backtracks,
+                "forced": self.forced,
+                "guesses": self.guesses,
+                "solutions": self.solutions,
+                "max_depth": self.max_depth,
+                "dead_ends": dict(self.dead_ends),
+                "times": dict(self.times)}
+
+    def add(self, values):
+        """
+        Adds the statistics of another search (e.g., of a subtree that was searched in another process).
+        :param values: A dictionary, see as_dict.
+        :return: None
+        """
+        for name, value in values.items():
+            if name == "max_depth":
+                self.max_depth = max(self.max_depth, value)
+            elif isinstance(value, dict):
+                counts = getattr(self, name)
+                for key, number in value.items():
+                    counts[key] = counts.get(key, 0) + number
+            else:
+                setattr(self, name, getattr(self, name) + value)
+
+    def restore(self, values):
+        """
+        Sets the statistics to the values from as_dict.
+        :param values: A dictionary, see as_dict.
+        :return: None
+        """
+        for name, value in values.items():
+            setattr(self, name, dict(value) if isinstance(value, dict) else value)
+
+    def to_json(self):
+        return json.dumps(self.as_dict())
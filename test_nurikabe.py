@@ -0,0 +1,188 @@
+import os
+import tempfile
+import unittest
+from os.path import dirname, exists, join
+from benchmark import synthetic_puzzle
+from batch import matches_pencil_paper
+from checkpoint import resume
+from nurikabe import *
+from saveAndLoad import *
+
+DIRECTORY = join(dirname(__file__), "exampleNurikabes")
+# {ind: the number of solutions of the nurikabe 'nurikabe<ind>.txt'}
+EXAMPLES = {0: 1, 23: 1, 24: 1, 26: 10, 27: 2, 28: 7, 30: 5, 31: 19, 33: 6}
+# nurikabe28solution.txt is not a valid solution (the island of the stem (7, 6, 2) has a single field)
+INVALID_SOLUTIONS = {28}
+# (width, height, seeds) of the random nurikabes (see benchmark.synthetic_puzzle)
+RANDOM_PUZZLES = ((5, 5, range(20)), (7, 7, range(10)))
+
+
+def example_puzzles():
+    """
+    :return: List of pairs (name, (width, height, stems)) of the example nurikabes.
+    """
+    return [("nurikabe{}".format(ind), load_nurikabe(ind, DIRECTORY)) for ind in EXAMPLES]
+
+
+def random_puzzles():
+    """
+    :return: List of pairs (name, (width, height, stems)) of the random nurikabes.
+    """
+    return [("random {}x{} ({})".format(width, height, seed), (width, height, synthetic_puzzle(width, height, seed)))
+            for (width, height, seeds) in RANDOM_PUZZLES for seed in seeds]
+
+
+def new_nurikabe(puzzle, collect_solutions=True):
+    width, height, stems = puzzle
+    return Nurikabe(width, height, stems, None, verbose=False, collect_solutions=collect_solutions)
+
+
+def stats_without_times(nurikabe):
+    stats = nurikabe.stats.as_dict()
+    stats.pop("times", None)
+    return stats
+
+
+def key(grid):
+    return tuple(tuple(line) for line in grid)
+
+
+class ExampleTest(unittest.TestCase):
+    def test_number_of_solutions(self):
+        for (ind, number) in EXAMPLES.items():
+            with self.subTest(ind=ind):
+                self.assertEqual(new_nurikabe(load_nurikabe(ind, DIRECTORY)).get_number_of_solutions(), number)
+
+    def test_pencil_paper_solutions(self):
+        for ind in EXAMPLES:
+            if ind in INVALID_SOLUTIONS or not exists(join(DIRECTORY, "nurikabe{}solution.txt".format(ind))):
+                continue
+            with self.subTest(ind=ind):
+                pencil_paper_solution = load_solution(ind, DIRECTORY)
+                nurikabe = new_nurikabe(load_nurikabe(ind, DIRECTORY))
+                number = nurikabe.get_number_of_solutions()
+                if isinstance(pencil_paper_solution, bool):
+                    self.assertEqual(pencil_paper_solution, number > 0)
+                else:
+                    self.assertTrue(any(matches_pencil_paper(nurikabe, grid, pencil_paper_solution)
+                                        for grid in nurikabe.solutions))
+
+
+class SearchTest(unittest.TestCase):
+    """
+    The drivers of the search (solve, solve_iterative, iter_solutions, count_solutions, solve_with_budget) should
+    visit the same nodes and find the same solutions.
+    """
+    def check_drivers(self, puzzle):
+        recursive = new_nurikabe(puzzle)
+        recursive.solve(only_untill_first_solution=False)
+        number = recursive.number_feasible_solutions
+        self.assertEqual(number, len(set(map(key, recursive.solutions))))
+
+        iterative = new_nurikabe(puzzle)
+        trail = list(iterative.board.trail)
+        iterative.solve_iterative(only_untill_first_solution=False)
+        self.assertEqual(iterative.solutions, recursive.solutions)
+        self.assertEqual(iterative.number_of_steps, recursive.number_of_steps)
+        self.assertEqual(stats_without_times(iterative), stats_without_times(recursive))
+        self.assertEqual(list(iterative.board.trail), trail)
+        self.assertEqual(iterative.depth, 0)
+
+        lazy = new_nurikabe(puzzle, collect_solutions=False)
+        self.assertEqual(list(map(key, lazy.iter_solutions())), list(map(key, recursive.solutions)))
+        self.assertEqual(list(lazy.board.trail), trail)
+
+        for limit in (None, 1, 2, number + 1):
+            with self.subTest(limit=limit):
+                limited = new_nurikabe(puzzle, collect_solutions=False)
+                self.assertEqual(limited.count_solutions(limit), number if limit is None else min(limit, number))
+                self.assertEqual(list(limited.board.trail), trail)
+
+        budget = new_nurikabe(puzzle).solve_with_budget()
+        self.assertEqual(budget["solutions"], number)
+        self.assertEqual(budget["nodes"], recursive.stats.nodes)
+
+    def test_examples(self):
+        for (name, puzzle) in example_puzzles():
+            with self.subTest(name):
+                self.check_drivers(puzzle)
+
+    def test_random(self):
+        for (name, puzzle) in random_puzzles():
+            with self.subTest(name):
+                self.check_drivers(puzzle)
+
+    def test_first_solution(self):
+        for (name, puzzle) in example_puzzles() + random_puzzles():
+            with self.subTest(name):
+                recursive, iterative = new_nurikabe(puzzle), new_nurikabe(puzzle)
+                self.assertEqual(recursive.solve(True), iterative.solve_iterative(True))
+                self.assertEqual(recursive.board.grid(), iterative.board.grid())
+                self.assertEqual(recursive.number_of_steps, iterative.number_of_steps)
+
+    def test_invalid_limit(self):
+        nurikabe = new_nurikabe(load_nurikabe(0, DIRECTORY))
+        for limit in (0, -1):
+            self.assertRaises(ValueError, nurikabe.count_solutions, limit)
+            self.assertRaises(ValueError, nurikabe.solve_with_budget, limit)
+
+    def test_node_budget(self):
+        nurikabe = new_nurikabe(load_nurikabe(28, DIRECTORY))
+        trail = list(nurikabe.board.trail)
+        result = nurikabe.solve_with_budget(max_nodes=10)
+        self.assertEqual(result["status"], NODE_BUDGET)
+        self.assertEqual(list(nurikabe.board.trail), trail)
+
+
+class DomainTest(unittest.TestCase):
+    def test_compute_domains(self):
+        """
+        The domains computed for all the fields at once (compute_domains) should be the same as the ones computed
+        for every field separately (reachable_islands, can_be_sea), on every node of the search.
+        """
+        def check(nurikabe, depth):
+            board = nurikabe.board
+            mask = board.unknown_mask & ~nurikabe.domain_mask
+            expected = {index: (nurikabe.reachable_islands(index), nurikabe.can_be_sea(index))
+                        for index in iterate_bits(mask)}
+            nurikabe.compute_domains(mask)
+            self.assertEqual({index: nurikabe.domains[index] for index in expected}, expected)
+
+        for (name, puzzle) in example_puzzles() + random_puzzles():
+            with self.subTest(name):
+                nurikabe = new_nurikabe(puzzle, collect_solutions=False)
+                nurikabe.on_node = check
+                nurikabe.solve_iterative(only_untill_first_solution=False)
+
+
+class CheckpointTest(unittest.TestCase):
+    def test_resume(self):
+        """
+        A search that is interrupted and resumed from its checkpoint should find the same solutions.
+        """
+        class Interrupted(Exception):
+            pass
+
+        def interrupt(nurikabe, depth):
+            if nurikabe.number_of_steps == 100:
+                raise Interrupted()
+
+        for ind in (28, 31):
+            with self.subTest(ind=ind):
+                puzzle = load_nurikabe(ind, DIRECTORY)
+                expected = new_nurikabe(puzzle)
+                expected.solve_iterative(only_untill_first_solution=False)
+                with tempfile.TemporaryDirectory() as directory:
+                    path = join(directory, "count.json")
+                    nurikabe = new_nurikabe(puzzle)
+                    nurikabe.on_node = interrupt
+                    with self.assertRaises(Interrupted):
+                        nurikabe.solve_iterative(False, checkpoint=path, checkpoint_interval=0.0)
+                    resumed = resume(path, checkpoint_interval=0.0)
+                    self.assertFalse(os.path.exists(path))
+                self.assertEqual(resumed.solutions, expected.solutions)
+                self.assertEqual(resumed.number_of_steps, expected.number_of_steps)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from nurikabe import *
+from parallel import count_solutions, solve_parallel
+from test_nurikabe import example_puzzles, key, new_nurikabe, random_puzzles, stats_without_times
+
+
+class ParallelTest(unittest.TestCase):
+    """
+    The parallel search should find the same solutions and visit the same nodes as the sequential one. The subtrees
+    are split often (small frontier_depth and max_steps), so that many of them are sent back to the pool.
+    """
+    def check_parallel(self, puzzle, heuristic):
+        sequential = new_nurikabe(puzzle)
+        sequential.heuristic = heuristic
+        sequential.solve_iterative(only_untill_first_solution=False)
+        parallel = new_nurikabe(puzzle)
+        parallel.heuristic = heuristic
+        number = solve_parallel(parallel, processes=2, frontier_depth=2, max_steps=20)
+        self.assertEqual(number, sequential.number_feasible_solutions)
+        self.assertEqual(sorted(map(key, parallel.solutions)), sorted(map(key, sequential.solutions)))
+        self.assertEqual(parallel.number_of_steps, sequential.number_of_steps)
+        self.assertEqual(stats_without_times(parallel), stats_without_times(sequential))
+
+    def test_examples(self):
+        for (name, puzzle) in example_puzzles():
+            for heuristic in HEURISTICS.values():
+                with self.subTest(name, heuristic=heuristic.name):
+                    self.check_parallel(puzzle, heuristic)
+
+    def test_random(self):
+        for (name, puzzle) in random_puzzles()[::5]:
+            with self.subTest(name):
+                self.check_parallel(puzzle, Heuristic())
+
+    def test_count_solutions(self):
+        for (name, (width, height, stems)) in example_puzzles():
+            with self.subTest(name):
+                sequential = new_nurikabe((width, height, stems))
+                number, solutions = count_solutions(width, height, stems, processes=2, frontier_depth=3,
+                                                    collect_solutions=True)
+                self.assertEqual(number, sequential.get_number_of_solutions())
+                self.assertEqual(sorted(map(key, solutions)), sorted(map(key, sequential.solutions)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from placement import *
+from test_nurikabe import example_puzzles, key, new_nurikabe, random_puzzles
+
+
+class PlacementTest(unittest.TestCase):
+    """
+    The search that places whole islands should find the same solutions as the search of Nurikabe.
+    """
+    def check_placements(self, puzzle):
+        nurikabe = new_nurikabe(puzzle)
+        number = nurikabe.get_number_of_solutions()
+        search = PlacementSearch(*puzzle)
+        trail = list(search.board.trail)
+        self.assertEqual(sorted(map(key, search.iter_solutions())), sorted(map(key, nurikabe.solutions)))
+        self.assertEqual(list(search.board.trail), trail)
+        for limit in (1, 2, number + 1):
+            with self.subTest(limit=limit):
+                self.assertEqual(PlacementSearch(*puzzle).count_solutions(limit), min(limit, number))
+
+    def test_examples(self):
+        for (name, puzzle) in example_puzzles():
+            with self.subTest(name):
+                self.check_placements(puzzle)
+
+    def test_random(self):
+        for (name, puzzle) in random_puzzles():
+            with self.subTest(name):
+                self.check_placements(puzzle)
+
+    def test_invalid_limit(self):
+        search = PlacementSearch(*example_puzzles()[0][1])
+        for limit in (0, -1):
+            self.assertRaises(ValueError, search.count_solutions, limit)
+
+    def test_too_many_placements(self):
+        width, height, stems = random_puzzles()[0][1]
+        self.assertRaises(TooManyPlacements, PlacementSearch, width, height, stems, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
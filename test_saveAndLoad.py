@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from os.path import join
+from collection import *
+from saveAndLoad import *
+from test_nurikabe import DIRECTORY
+
+
+class ParseTest(unittest.TestCase):
+    def test_parse_nurikabe(self):
+        self.assertEqual(parse_nurikabe("width;4\nheight;3\nstems;[(1, 0, 1), ( 3,2,2 )]\n"),
+                         [4, 3, [(1, 0, 1), (3, 2, 2)]])
+        self.assertEqual(parse_nurikabe("width;4\nheight;3\nstems;[]"), [4, 3, []])
+
+    def test_invalid_nurikabe(self):
+        invalid = ["width;4\nheight;3\nstems;[(1,0,1)(3,2,2)]",
+                   "width;4\nheight;3\nstems;[(1,0,1),,(3,2,2)]",
+                   "width;4\nheight;3\nstems;[(-1,0,1)]",
+                   "width;4\nheight;3\nstems;[(4,0,1)]",
+                   "width;4\nheight;3\nstems;[(1,0,0)]",
+                   "width;4\nheight;3\nstems;[(1,0,1),(1,0,2)]",
+                   "width;4\nheight;3\nwidth;5\nstems;[]",
+                   "width;4\nheight;3\ncolour;red\nstems;[]",
+                   "width;4\nstems;[]"]
+        for text in invalid:
+            with self.subTest(text):
+                self.assertRaises(ValueError, parse_nurikabe, text)
+
+    def test_parse_solution(self):
+        self.assertEqual(parse_solution("[[1, 0, ''], [0, 0, 2]]"), [[1, 0, ""], [0, 0, 2]])
+        self.assertIs(parse_solution("True\n"), True)
+        self.assertIs(parse_solution("False"), False)
+        for text in ("[[1, 0][0, 0]]", "[[1, 0],,[0, 0]]", "[[1, x]]"):
+            with self.subTest(text):
+                self.assertRaises(ValueError, parse_solution, text)
+
+
+class CollectionTest(unittest.TestCase):
+    def test_round_trip(self):
+        puzzles = list(read_directory([DIRECTORY]))
+        with tempfile.TemporaryDirectory() as directory:
+            path = join(directory, "puzzles.nkc")
+            self.assertEqual(write_collection(path, puzzles), len(puzzles))
+            with Collection(path) as collection:
+                self.assertEqual([tuple(puzzle) for puzzle in collection], puzzles)
+                unpacked = join(directory, "unpacked")
+                os.mkdir(unpacked)
+                write_directory(collection, unpacked)
+            self.assertEqual(list(read_directory([unpacked])), puzzles)
+
+    def test_repeated_index(self):
+        puzzles = list(read_directory([DIRECTORY]))
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertRaises(ValueError, write_collection, join(directory, "puzzles.nkc"), puzzles + puzzles[:1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from batch import sizes_grid
+from benchmark import synthetic_puzzle
+from service import *
+from test_nurikabe import example_puzzles, new_nurikabe, random_puzzles
+
+
+def rotated(width, height, stems):
+    """
+    :return: The nurikabe (width, height, stems), rotated by 90 degrees.
+    """
+    return height, width, [(height - 1 - y, x, size) for (x, y, size) in stems]
+
+
+def rotated_grid(grid):
+    """
+    :return: The solution of the rotated nurikabe (see rotated).
+    """
+    return [list(line) for line in zip(*grid[::-1])]
+
+
+def request(puzzle, **options):
+    width, height, stems = puzzle
+    return dict(width=width, height=height, stems=[list(stem) for stem in stems], **options)
+
+
+class ServiceTest(unittest.TestCase):
+    """
+    The responses of the service should agree with the direct solver, also when they are answered from the cache.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.service = SolverService(processes=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.close()
+
+    def check_service(self, puzzle):
+        nurikabe = new_nurikabe(puzzle)
+        number = nurikabe.get_number_of_solutions()
+        expected = sorted(sizes_grid(nurikabe, grid) for grid in nurikabe.solutions)
+        response = self.service.solve(request(puzzle, id=1, grids=True))
+        self.assertEqual(response["id"], 1)
+        self.assertEqual(response["status"], "unique" if number == 1 else "solved" if number else "no solution")
+        self.assertEqual(response["solutions"], number)
+        self.assertEqual(sorted(response["grids"]), expected)
+        for limit in (1, 2):
+            with self.subTest(limit=limit):
+                response = self.service.solve(request(puzzle, limit=limit))
+                self.assertTrue(response["cached"])
+                self.assertEqual(response["solutions"], min(limit, number))
+        # the same nurikabe in another orientation
+        response = self.service.solve(request(rotated(*puzzle), grids=True))
+        self.assertTrue(response["cached"])
+        self.assertEqual(response["solutions"], number)
+        self.assertEqual(sorted(response["grids"]), sorted(rotated_grid(grid) for grid in expected))
+
+    def test_examples(self):
+        for (name, puzzle) in example_puzzles():
+            with self.subTest(name):
+                self.check_service(puzzle)
+
+    def test_random(self):
+        for (name, puzzle) in random_puzzles():
+            with self.subTest(name):
+                self.check_service(puzzle)
+
+    def test_node_budget(self):
+        puzzle = (8, 8, synthetic_puzzle(8, 8, 0))  # not solved by the other tests, so it is not cached
+        response = self.service.solve(request(puzzle, max_nodes=5))
+        self.assertEqual(response["status"], NODE_BUDGET)
+        self.assertFalse(response["cached"])
+
+    def test_invalid_requests(self):
+        puzzle = (4, 4, [(1, 0, 1), (3, 0, 1), (0, 2, 2), (2, 3, 2)])
+        invalid = [request(puzzle, limit=0),
+                   request(puzzle, limit=1.5),
+                   request(puzzle, max_nodes=-1),
+                   request(puzzle, time_limit="1"),
+                   request((4, 4, [(4, 0, 1)])),
+                   request((4, 4, [(0, 0, 0)])),
+                   request((4, 4, [(0, 0, 1), (0, 0, 2)])),
+                   {"id": 2, "width": 4}]
+        for (i, invalid_request) in enumerate(invalid):
+            with self.subTest(i=i):
+                self.assertEqual(self.service.solve(invalid_request)["status"], "error")
+
+
+if __name__ == "__main__":
+    unittest.main()